@@ -0,0 +1,44 @@
+"""Submits 5k to 50k sprites to a headless screen one `blit` at a time and batched through `Surface.blits`.
+
+Run with `python benchmarks/bench_blits.py`."""
+from __future__ import annotations
+
+import os
+import random
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+SIZES = (5_000, 10_000, 25_000, 50_000)
+SOURCES = 16
+NUMBER = 5
+
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode((1280, 720))
+    sources = []
+    for i in range(SOURCES):
+        source = pygame.Surface((16, 16)).convert()
+        source.fill((i * 16, 255 - i * 16, 128))
+        sources.append(source)
+    for n in SIZES:
+        random.seed(n)
+        sprites = [(random.choice(sources), (random.randrange(1280), random.randrange(720))) for _ in range(n)]
+
+        def per_blit():
+            for img, pos in sprites:
+                screen.blit(img, pos)
+
+        def batched():
+            screen.blits(sprites, doreturn=False)
+
+        single = timeit.timeit(per_blit, number=NUMBER) / NUMBER * 1e3
+        batch = timeit.timeit(batched, number=NUMBER) / NUMBER * 1e3
+        print(f"{n:>6} sprites  per-blit {single:8.2f} ms  blits {batch:8.2f} ms  ({single / batch:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
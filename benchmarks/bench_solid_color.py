@@ -0,0 +1,85 @@
+"""Renders 10k solid color quads, drawn as fills and polygons, against quads backed by a surface each.
+
+Surface backed quads are what SolidColorRenderer used to be, a filled copy of `load_image("")` per renderer. They are
+timed on fewer instances, at 10k they would not fit in memory.
+
+Run with `python benchmarks/bench_solid_color.py [quads]`."""
+from __future__ import annotations
+
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(Path(__file__).resolve().parent.parent)
+
+import pygame
+
+from color import Color
+from components import Transform, SolidColorRenderer, TransformedImageRenderer
+from game_object import GameObject
+from game_scene import GameScene
+from rect import Rect
+from resource_loader import load_image
+from sprite_cache import surface_bytes
+from vector import Vector
+
+QUADS = 10_000
+SURFACE_QUADS = 50
+FRAMES = 10
+VIEW = Rect((0, 0), (100, 100))
+
+
+def build(quads: int, rotated: bool, surfaces: bool) -> GameScene:
+    objects = []
+    for i in range(quads):
+        obj = GameObject()
+        transform = obj.add_component(Transform)
+        transform.pos = Vector(i % 100 + .5, i // 100 % 100 + .5)
+        transform.scale = Vector(.8, .8)
+        if rotated:
+            transform.rotation = i * 7. % 360
+        color = Color(i % 7 / 6, i % 5 / 4, i % 3 / 2)
+        if surfaces:
+            renderer = obj.add_component(TransformedImageRenderer)
+            image = load_image("", copy=True)
+            image.fill(color.rgb_255)
+            renderer.image = image
+        else:
+            obj.add_component(SolidColorRenderer).color = color
+        objects.append(obj)
+    return GameScene("bench", objects, Color(1., 1., 1.))
+
+
+def run(screen: pygame.Surface, quads: int, rotated: bool, surfaces: bool):
+    tracemalloc.start()
+    scene = build(quads, rotated, surfaces)
+    python_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    held = sum(surface_bytes(r.image) for obj in scene.game_objects for r in obj.renderers if r.image is not None)
+    scene.render(screen, VIEW)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        scene.render(screen, VIEW)
+    frame = (time.perf_counter() - start) / FRAMES * 1e3
+    kind = "surfaces" if surfaces else "direct"
+    print(f"{quads:>6} quads  {kind:<8} rotated={rotated!s:<5}  {frame:8.2f} ms/frame  "
+          f"{frame / quads * 1e3:6.2f} us/quad  surfaces {held / 2 ** 20:9.1f} MB  python {python_bytes / 2 ** 20:6.1f} MB")
+
+
+def main():
+    quads = int(sys.argv[1]) if len(sys.argv) > 1 else QUADS
+    pygame.init()
+    screen = pygame.display.set_mode((1000, 1000))
+    for rotated in (False, True):
+        run(screen, quads, rotated, surfaces=False)
+        run(screen, SURFACE_QUADS, rotated, surfaces=True)
+    per_quad = surface_bytes(load_image(""))
+    print(f"Surface backed quads hold {per_quad / 2 ** 20:.1f} MB each, {per_quad * quads / 2 ** 30:.1f} GB for {quads}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Scaling of the collider broadphases from 100 to 100k colliders, compared to the pairwise O(n²) loop.
+
+Every index gets its own identical set of colliders, a tenth of which are moved before `refresh`. The pairs each index
+finds are checked against a brute-force pass up to `MAX_BRUTE_FORCE` colliders, and against each other beyond.
+
+Run with `python benchmarks/bench_spatial_index.py [max_colliders]`."""
+from __future__ import annotations
+
+import itertools
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+
+from components import Transform, RectCollider
+from game_object import GameObject
+from rect import Rect
+from spatial_index import UniformGrid, LooseQuadtree, SweepAndPrune, bounds_overlap
+from vector import Vector
+
+SIZES = (100, 1_000, 10_000, 100_000)
+DENSITY = 0.05  # Colliders per square unit
+MAX_PAIRWISE = 2_000
+MAX_BRUTE_FORCE = 10_000
+
+
+def make_colliders(n: int):
+    random.seed(n)
+    side = (n / DENSITY) ** .5
+    colliders = []
+    for _ in range(n):
+        obj = GameObject()
+        obj.add_component(Transform).pos = Vector(random.uniform(0, side), random.uniform(0, side))
+        collider = obj.add_component(RectCollider)
+        collider.local_rect = Rect((0, 0), (random.uniform(.5, 2), random.uniform(.5, 2)))
+        colliders.append(collider)
+    return colliders, side
+
+
+def move(colliders):
+    for collider in colliders[::10]:
+        collider.game_object.transform.pos += (.5, .5)
+
+
+def brute_force_pairs(colliders):
+    """Pairs of positions in `colliders` with overlapping bounds, checked with numpy in chunks of rows"""
+    bounds = np.array([c.bounds for c in colliders])
+    pairs = set()
+    for start in range(0, len(bounds), 1_000):
+        rows = bounds[start:start + 1_000]
+        overlap = (rows[:, None, 0] <= bounds[None, :, 2]) & (bounds[None, :, 0] <= rows[:, None, 2]) & \
+                  (rows[:, None, 1] <= bounds[None, :, 3]) & (bounds[None, :, 1] <= rows[:, None, 3])
+        for i, j in zip(*np.nonzero(overlap)):
+            if start + i < j:
+                pairs.add((start + int(i), int(j)))
+    return pairs
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1e3
+
+
+def main(max_colliders: int = SIZES[-1]):
+    for n in (n for n in SIZES if n <= max_colliders):
+        colliders, side = make_colliders(n)
+        move(colliders)
+        if n <= MAX_PAIRWISE:
+            bounds = [c.bounds for c in colliders]
+            pairs, t = timed(lambda: sum(bounds_overlap(a, b) for a, b in itertools.combinations(bounds, 2)))
+            print(f"{n:>7} pairwise     {'':>26} pairs {t:9.2f} ms ({pairs} pairs)")
+        expected = brute_force_pairs(colliders) if n <= MAX_BRUTE_FORCE else None
+        for index in (UniformGrid(2.), LooseQuadtree(side), SweepAndPrune()):
+            colliders, _ = make_colliders(n)
+            _, build = timed(lambda: [index.insert(c) for c in colliders])
+            move(colliders)
+            _, refresh = timed(index.refresh)
+            found, t = timed(lambda: list(index.all_pairs()))
+            positions = {c: i for i, c in enumerate(colliders)}
+            found = {tuple(sorted((positions[a], positions[b]))) for a, b in found}
+            if expected is None:
+                expected = found
+            assert found == expected, f"{type(index).__name__} found {len(found)} pairs instead of {len(expected)}"
+            pairs = len(found)
+            query = Rect((side / 2, side / 2), (side / 2 + 10, side / 2 + 10))
+            _, q = timed(lambda: [index.query_rect(query) for _ in range(100)])
+            print(f"{n:>7} {type(index).__name__:<12} build {build:9.2f} ms refresh {refresh:9.2f} ms "
+                  f"pairs {t:9.2f} ms ({pairs} pairs) 100 queries {q:8.2f} ms")
+            if isinstance(index, SweepAndPrune):
+                print(f"{'':>7} {index.report}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
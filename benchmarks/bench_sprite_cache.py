@@ -0,0 +1,60 @@
+"""Renders many rotating instances of one sprite with and without the shared TransformedSpriteCache.
+
+Run with `python benchmarks/bench_sprite_cache.py [instances]`."""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pygame
+
+from components import Transform, TransformedImageRenderer
+from game_object import GameObject
+from sprite_cache import TransformedSpriteCache
+
+INSTANCES = 2_000
+FRAMES = 10
+
+
+def run(instances: int, sprite_cache: TransformedSpriteCache = None, prewarm: bool = False) -> float:
+    TransformedImageRenderer.sprite_cache = sprite_cache
+    source = pygame.Surface((64, 64), pygame.SRCALPHA)
+    source.fill((255, 0, 0))
+    renderers = []
+    for i in range(instances):
+        obj = GameObject()
+        obj.add_component(Transform).rotation = i * 7.
+        renderer = obj.add_component(TransformedImageRenderer)
+        renderer.image = source
+        renderers.append(renderer)
+    if prewarm:
+        sprite_cache.prewarm(source)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        for renderer in renderers:
+            renderer.game_object.transform.rotation += 3.
+            _ = renderer.image
+    return (time.perf_counter() - start) / FRAMES * 1e3
+
+
+def main(instances: int = INSTANCES):
+    pygame.init()
+    unshared = run(instances)
+    print(f"{instances} instances, per-renderer caches  {unshared:9.2f} ms/frame")
+    for angle_step in (1., 5.):
+        cache = TransformedSpriteCache(angle_step=angle_step)
+        shared = run(instances, cache)
+        print(f"{instances} instances, shared {angle_step:g}° buckets   {shared:9.2f} ms/frame  "
+              f"({unshared / shared:.1f}x, {cache.surfaces})")
+        cache = TransformedSpriteCache(angle_step=angle_step)
+        warm = run(instances, cache, prewarm=True)
+        print(f"{instances} instances, prewarmed {angle_step:g}° buckets {warm:9.2f} ms/frame  ({unshared / warm:.1f}x)")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,44 @@
+"""Moves and rotates 10k pooled Transforms, once through their handles and once through the raw pool arrays.
+
+Run with `python benchmarks/bench_transform_pool.py`."""
+from __future__ import annotations
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from components import Transform
+from game_object import GameObject
+from transform_pool import TransformPool
+from vector import Vector, VectorArray
+
+OBJECTS = 10_000
+NUMBER = 5
+
+
+def main():
+    pool = TransformPool()
+    for i in range(OBJECTS):
+        pool.add(GameObject(f"Object{i}").add_component(Transform))
+    velocities = VectorArray([(0.5, 0.25)] * OBJECTS)
+    velocity_list = [Vector(*v) for v in velocities.data.tolist()]
+
+    def through_handles():
+        for transform, velocity in zip(pool.handles, velocity_list):
+            transform.pos += velocity
+            transform.rotation += 0.1
+
+    def through_arrays():
+        pool.pos += velocities
+        pool.rotation += 0.1
+
+    handles = timeit.timeit(through_handles, number=NUMBER) / NUMBER
+    arrays = timeit.timeit(through_arrays, number=NUMBER) / NUMBER
+    print(f"{OBJECTS} transforms through handles {handles * 1e3:9.3f} ms/update")
+    print(f"{OBJECTS} transforms through arrays  {arrays * 1e3:9.3f} ms/update  ({handles / arrays:.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
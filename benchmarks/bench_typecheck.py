@@ -0,0 +1,55 @@
+"""Compares the compiled typecheck validators with the interpreted `typecheck_function` path.
+
+Run with `python benchmarks/bench_typecheck.py`."""
+from __future__ import annotations
+
+import sys
+import timeit
+from functools import wraps
+from pathlib import Path
+from typing import Any, Callable, get_type_hints
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from typecheck import typecheck_function, typecheck_value
+from vector import Vector
+
+NUMBER = 100_000
+
+
+def interpreted(func: Callable) -> Callable:
+    """The wrapper `get_typechecked_function` used before validators were compiled"""
+    localns = {"Vector": Vector}
+    type_hints = get_type_hints(func, localns=localns)
+    result_type_hint = type_hints.get("return", Any)
+
+    @wraps(func)
+    def _(*args, **kwargs):
+        if not typecheck_function(func, args, kwargs, type_hints, localns):
+            raise TypeError(f"Unallowed args or kwargs for function '{func.__qualname__}'")
+        result = func(*args, **kwargs)
+        if not typecheck_value(result_type_hint, result):
+            raise TypeError(f"Unexpected return value '{result}'. Expected '{result_type_hint}'")
+        return result
+
+    return _
+
+
+def main():
+    raw_add = Vector.__add__.__wrapped__
+    cases = {
+        "unchecked": raw_add,
+        "compiled": Vector.__add__,
+        "interpreted": interpreted(raw_add),
+    }
+    v = Vector(1, 2)
+    for other_name, other in (("tuple", (3, 4)), ("Vector", Vector(3, 4))):
+        baseline = None
+        for name, add in cases.items():
+            t = timeit.timeit(lambda: add(v, other), number=NUMBER)
+            baseline = baseline or t
+            print(f"Vector.__add__ {other_name:<7} {name:<12} {t / NUMBER * 1e6:8.2f} us/call  ({t / baseline:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
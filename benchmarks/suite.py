@@ -0,0 +1,264 @@
+"""Headless benchmarks of the engine's hot paths, with results that can be compared between runs.
+
+Run with `python benchmarks/suite.py [--output results.json] [--compare baseline.json] [--filter name] [--quick]`.
+
+Every benchmark reports operations per second and percentiles of the time per operation (or per frame) in
+milliseconds. With `--compare`, benchmarks whose ops/sec dropped by more than `--threshold` (20% by default) against the
+baseline, and whose median time rose by more than the p95/p50 spread of either run, are reported as regressions and the
+exit code is 1. Timings of separate runs on a busy or frequency-scaling machine can differ by more than that, compare
+runs made under the same conditions. Set TYPECHECK_STRIP=1 to measure with the typecheck wrappers stripped, the
+results record whether they were."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(Path(__file__).resolve().parent.parent)
+
+import numpy as np
+import pygame
+
+import resource_loader
+import typecheck
+from color import Color
+from components import Transform, TransformedImageRenderer, SolidColorRenderer, Renderer
+from game_object import GameObject
+from game_scene import GameScene
+from rect import Rect
+from resource_loader import load_image
+from vector import Vector
+
+PERCENTILES = (50, 95, 99)
+RENDER_SIZES = (100, 1_000, 10_000, 50_000)
+
+BENCHMARKS: Dict[str, Callable[[bool], Dict[str, float]]] = {}
+
+
+def benchmark(name: str):
+    def register(func: Callable[[bool], Dict[str, float]]):
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+def measure(op: Callable[[], object], number: int, repeat: int = 20) -> Dict[str, float]:
+    """Times `repeat` batches of `number` calls of `op`, percentiles are of the time per call"""
+    op()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        times.append((time.perf_counter() - start) / number)
+    return summarize(np.array(times))
+
+
+def summarize(times: np.ndarray) -> Dict[str, float]:
+    result = {"ops_per_sec": float(1 / np.median(times))}
+    result.update({f"p{p}_ms": float(v * 1e3) for p, v in zip(PERCENTILES, np.percentile(times, PERCENTILES))})
+    return result
+
+
+def _vector_arithmetic(checked: bool) -> Dict[str, float]:
+    enabled = typecheck.config["enabled"]
+    typecheck.config["enabled"] = checked and enabled
+    try:
+        a, b = Vector(1, 2), Vector(3, 4)
+        return measure(lambda: (a + b) * 2. - a, 10_000)
+    finally:
+        typecheck.config["enabled"] = enabled
+
+
+@benchmark("vector.arithmetic.typecheck_on")
+def vector_arithmetic_checked(quick: bool) -> Dict[str, float]:
+    return _vector_arithmetic(True)
+
+
+@benchmark("vector.arithmetic.typecheck_off")
+def vector_arithmetic_unchecked(quick: bool) -> Dict[str, float]:
+    return _vector_arithmetic(False)
+
+
+@benchmark("rect.relative_rect")
+def rect_relative_rect(quick: bool) -> Dict[str, float]:
+    parent, child = Rect((0, 0), (10, 10)), Rect((2, 3), (4, 5))
+    return measure(lambda: child.relative_rect(parent), 5_000)
+
+
+@benchmark("rect.collide_rect")
+def rect_collide_rect(quick: bool) -> Dict[str, float]:
+    a, b = Rect((0, 0), (10, 10)), Rect((5, 5), (15, 15))
+    return measure(lambda: a.collide_rect(b), 10_000)
+
+
+@benchmark("game_object.get_component")
+def game_object_get_component(quick: bool) -> Dict[str, float]:
+    obj = GameObject()
+    obj.add_component(Transform)
+    obj.add_component(TransformedImageRenderer)
+    return measure(lambda: (obj.get_component(Transform), obj.get_component(Renderer), obj.transform), 10_000)
+
+
+def _cached_renderer() -> TransformedImageRenderer:
+    obj = GameObject()
+    obj.add_component(Transform)
+    renderer = obj.add_component(TransformedImageRenderer)
+    # The per-renderer cache of CachedRenderer, instead of the shared one
+    renderer.sprite_cache = None
+    source = pygame.Surface((64, 64), pygame.SRCALPHA)
+    source.fill((255, 0, 0))
+    renderer.image = source
+    return renderer
+
+
+@benchmark("cached_renderer.hit")
+def cached_renderer_hit(quick: bool) -> Dict[str, float]:
+    renderer = _cached_renderer()
+    return measure(lambda: renderer.image, 5_000)
+
+
+@benchmark("cached_renderer.miss")
+def cached_renderer_miss(quick: bool) -> Dict[str, float]:
+    renderer = _cached_renderer()
+    transform = renderer.game_object.transform
+
+    def miss():
+        transform.rotation = (transform.rotation + 1.37) % 360
+        renderer.cache.clear()
+        return renderer.image
+
+    return measure(miss, 200)
+
+
+@benchmark("load_image.cached")
+def load_image_cached(quick: bool) -> Dict[str, float]:
+    return measure(lambda: load_image(""), 10_000)
+
+
+@benchmark("load_image.cold")
+def load_image_cold(quick: bool) -> Dict[str, float]:
+    def cold():
+        resource_loader._image_cache.clear()
+        resource_loader._resized_cache.clear()
+        resource_loader._display_images.clear()
+        return load_image("")
+
+    return measure(cold, 5, repeat=10)
+
+
+def _render(objects: int, frames: int, moving_every: int = 10, dirty_rects: bool = False) -> Dict[str, float]:
+    random.seed(objects)
+    side = max(10, int(objects ** .5))
+    source = pygame.Surface((32, 32), pygame.SRCALPHA)
+    source.fill((0, 128, 255))
+    game_objects = []
+    for i in range(objects):
+        obj = GameObject()
+        transform = obj.add_component(Transform)
+        transform.pos = Vector(i % side + .5, i // side % side + .5)
+        transform.rotation = random.choice((0., 90., 45.))
+        if i % 2:
+            obj.add_component(TransformedImageRenderer).image = source
+        else:
+            obj.add_component(SolidColorRenderer).color = Color(1., i % 3 / 2, 0.)
+        game_objects.append(obj)
+    scene = GameScene("bench", game_objects, Color(1., 1., 1.))
+    screen = pygame.display.get_surface()
+    view = Rect((0, 0), (side, side))
+    moving = game_objects[::moving_every]
+    scene.render(screen, view, dirty_rects=dirty_rects)
+    times = []
+    for frame in range(frames):
+        for obj in moving:
+            obj.transform.pos += (.01, 0.)
+        start = time.perf_counter()
+        scene.render(screen, view, dirty_rects=dirty_rects)
+        times.append(time.perf_counter() - start)
+    return summarize(np.array(times))
+
+
+for _size in RENDER_SIZES:
+    def _render_benchmark(quick: bool, objects=_size) -> Dict[str, float]:
+        return _render(objects, 3 if quick else max(5, min(50, 500_000 // objects)))
+
+    benchmark(f"game_scene.render.{_size}")(_render_benchmark)
+
+
+# 20 of 5k sprites moving, redrawn completely and as dirty rects
+@benchmark("game_scene.render.5000.20_moving")
+def render_few_moving(quick: bool) -> Dict[str, float]:
+    return _render(5_000, 3 if quick else 50, moving_every=250)
+
+
+@benchmark("game_scene.render.5000.20_moving.dirty_rects")
+def render_few_moving_dirty_rects(quick: bool) -> Dict[str, float]:
+    return _render(5_000, 3 if quick else 50, moving_every=250, dirty_rects=True)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], threshold: float
+            ) -> List[str]:
+    """Prints the change of ops/sec against `baseline`, returns the names of benchmarks that got slower than
+    `threshold` and than the noise of both runs: the median time has to rise by more than the p95/p50 spread of either
+    run, so a benchmark whose own timings vary by 30% isn't a regression at 25%"""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        ratio = result["ops_per_sec"] / old["ops_per_sec"]
+        noise = max(old["p95_ms"] / old["p50_ms"], result["p95_ms"] / result["p50_ms"])
+        regressed = ratio < 1 - threshold and result["p50_ms"] / old["p50_ms"] > noise
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<44} {ratio:6.2f}x  (noise {noise - 1:4.0%}){'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=.2,
+                        help="least relative ops/sec drop counted as a regression, see `compare`")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="fewer frames and no 50k object scene")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    pygame.display.set_mode((1280, 720))
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if args.filter not in name or args.quick and name == "game_scene.render.50000":
+            continue
+        result = results[name] = func(args.quick)
+        print(f"{name:<44} {result['ops_per_sec']:14,.1f} ops/s  " +
+              "  ".join(f"p{p} {result[f'p{p}_ms']:9.4f} ms" for p in PERCENTILES))
+
+    if args.output:
+        meta = dict(
+            time=time.strftime("%Y-%m-%dT%H:%M:%S"),
+            python=platform.python_version(),
+            pygame=pygame.version.ver,
+            numpy=np.__version__,
+            machine=platform.machine(),
+            typecheck_stripped=typecheck.config["stripped"],
+        )
+        Path(args.output).write_text(json.dumps({"meta": meta, "results": results}, indent=1))
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        return 1 if compare(results, baseline, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import math
+from typing import Tuple
+
+import numpy as np
+
+from rect import Rect
+from vector import Vector, VectorType
+
+
+class Camera:
+    """Maps world coordinates to pixels on a screen.
+
+    The camera looks at `center`, showing `size` world units (divided by `zoom`) across the screen, rotated
+    `rotation` degrees counterclockwise. Call `update` with the screen size once per frame; it computes the affine
+    transform `pixel = matrix @ world + offset` used by all other methods."""
+    center: Vector
+    size: Vector
+    rotation: float
+    zoom: float
+
+    def __init__(self, center: VectorType = (5, 5), size: VectorType = (10, 10), rotation: float = 0.,
+                 zoom: float = 1.):
+        self.center = Vector(center)
+        self.size = Vector(size)
+        self.rotation = rotation
+        self.zoom = zoom
+        self.update((1, 1))
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(center={self.center}, size={self.size}, rotation={self.rotation}, " \
+               f"zoom={self.zoom})"
+
+    @classmethod
+    def from_rect(cls, rect: Rect) -> Camera:
+        """A camera showing exactly `rect`, like the `screen_rect` passed to `GameScene.render` used to"""
+        return cls(rect.center, rect.size)
+
+    def pan(self, delta: VectorType):
+        self.center += delta
+
+    def zoom_by(self, factor: float):
+        self.zoom *= factor
+
+    def rotate(self, degrees: float):
+        self.rotation += degrees
+
+    def update(self, screen_size: Tuple[int, int]):
+        w, h = screen_size
+        self.screen_size = w, h
+        kx, ky = w * self.zoom / self.size.x, h * self.zoom / self.size.y
+        a = math.radians(-self.rotation)
+        cos, sin = math.cos(a), math.sin(a)
+        self.scale = kx, ky
+        self.matrix = np.array([[kx * cos, kx * sin], [-ky * sin, ky * cos]])
+        self.offset = np.array([w / 2, h / 2]) - self.matrix @ (self.center.x, self.center.y)
+        # Scalar copies for per-object use without numpy overhead
+        (self._a, self._b), (self._d, self._e) = self.matrix.tolist()
+        self._c, self._f = self.offset.tolist()
+
+    @property
+    def image_rotation(self) -> float:
+        """The rotation in degrees images have to be rotated by to match the view"""
+        return -self.rotation
+
+    def world_to_screen(self, point: VectorType) -> Tuple[float, float]:
+        x, y = point[0], point[1]
+        return self._a * x + self._b * y + self._c, self._d * x + self._e * y + self._f
+
+    def screen_to_world(self, pixel: VectorType) -> Vector:
+        x, y = np.linalg.solve(self.matrix, np.asarray(pixel, dtype=np.float64) - self.offset).tolist()
+        return Vector(x, y)
+
+    def points_to_screen(self, points: np.ndarray) -> np.ndarray:
+        """Maps an (N, 2) array of world points to pixels"""
+        return points @ self.matrix.T + self.offset
+
+    def bounds_to_screen(self, bounds: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Maps an (N, 4) array of world (left, top, right, bottom) bounds to pixels.
+
+        Returns the centers (N, 2), the sizes (N, 2) before applying `image_rotation` and the bounding boxes (N, 4)
+        on screen. With a different scale on each axis of the screen, a world axis is as long as the matrix column
+        mapping it, and the box is that of the mapped bounds, not of the rotated sizes."""
+        centers = self.points_to_screen((bounds[:, :2] + bounds[:, 2:]) / 2)
+        extents = bounds[:, 2:] - bounds[:, :2]
+        sizes = extents * np.hypot(self.matrix[0], self.matrix[1])
+        half = extents @ np.abs(self.matrix).T / 2
+        return centers, sizes, np.concatenate((centers - half, centers + half), axis=1)
+
+    def pixel_bounds(self, left: float, top: float, right: float, bottom: float) -> Tuple[float, float, float, float]:
+        """The world (left, top, right, bottom) bounds of a rectangle of pixels"""
+        pixels = np.array([[left, top], [right, top], [left, bottom], [right, bottom]], dtype=np.float64)
+        corners = np.linalg.solve(self.matrix, (pixels - self.offset).T).T
+        (x1, y1), (x2, y2) = corners.min(axis=0).tolist(), corners.max(axis=0).tolist()
+        return x1, y1, x2, y2
+
+    @property
+    def view_bounds(self) -> Tuple[float, float, float, float]:
+        """The world (left, top, right, bottom) bounds of everything visible"""
+        w, h = self.screen_size
+        return self.pixel_bounds(0, 0, w, h)
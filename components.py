@@ -1,13 +1,15 @@
 from __future__ import annotations
 
 import math
-from typing import Hashable, Dict, Tuple, Any
+from typing import Hashable, Tuple, Any, Optional, ClassVar
 
 import pygame
 
 from color import Color
+from profiler import profiler
 from rect import Rect
 from resource_loader import load_image
+from sprite_cache import SurfaceCache, TransformedSpriteCache, shared_sprites, rendered_images, transform_sprite
 from vector import Vector
 
 
@@ -18,31 +20,156 @@ class Component:
         self.game_object = game_object
 
 
+class TransformVector(Vector):
+    """`pos` or `scale` of a Transform that isn't pooled, marking its object as moved when changed in place"""
+    __slots__ = ("_transform", "_x", "_y")
+
+    def __init__(self, transform: Transform, x: float, y: float):
+        object.__setattr__(self, "_transform", transform)
+        self._set(x, y)
+
+    @property
+    def x(self) -> float:
+        return self._x
+
+    @x.setter
+    def x(self, value: float):
+        object.__setattr__(self, "_x", value)
+        self._transform._moved()
+
+    @property
+    def y(self) -> float:
+        return self._y
+
+    @y.setter
+    def y(self, value: float):
+        object.__setattr__(self, "_y", value)
+        self._transform._moved()
+
+    def _set(self, x: float, y: float):
+        """Sets both values without marking the object as moved"""
+        object.__setattr__(self, "_x", x)
+        object.__setattr__(self, "_y", y)
+
+
 class Transform(Component):
-    pos: Vector
-    scale: Vector
-    rotation: float
+    """Position, scale and rotation of a GameObject.
+
+    If the GameObject is part of a GameScene with pooled transforms, the values are stored in the scene's
+    `TransformPool` and the Transform only acts as a handle to row `index`.
+
+    `pos` and `scale` stay the same objects, assigning to them copies the values. Changing them in place, e.g.
+    `transform.pos.x += 1`, moves the object as well."""
+    pool: Optional[TransformPool]
+    index: int
 
     def __init__(self, game_object: GameObject):
         super().__init__(game_object)
-        self.pos = Vector(0, 0)
-        self.scale = Vector(1, 1)
-        self.rotation = 0
+        self.pool = None
+        self.index = -1
+        self._pos = TransformVector(self, 0, 0)
+        self._scale = TransformVector(self, 1, 1)
+        self._rotation = 0
+
+    @property
+    def pos(self) -> Vector:
+        return self._pos
+
+    @pos.setter
+    def pos(self, value: Vector):
+        if self.pool is None:
+            self._pos._set(value[0], value[1])
+        else:
+            self.pool._pos[self.index] = tuple(value)
+        self._moved()
+
+    @property
+    def scale(self) -> Vector:
+        return self._scale
+
+    @scale.setter
+    def scale(self, value: Vector):
+        if self.pool is None:
+            self._scale._set(value[0], value[1])
+        else:
+            self.pool._scale[self.index] = tuple(value)
+        self._moved()
+
+    @property
+    def rotation(self) -> float:
+        if self.pool is None:
+            return self._rotation
+        return float(self.pool._rotation[self.index])
+
+    @rotation.setter
+    def rotation(self, value: float):
+        if self.pool is None:
+            self._rotation = value
+        else:
+            self.pool._rotation[self.index] = value
+        self._moved()
+
+    def _moved(self):
+        scene = self.game_object.scene
+        if scene is not None:
+            scene.moved_objects.add(self.game_object)
+
+    def _set_state(self, x: float, y: float, rotation: float, sx: float, sy: float):
+        """Sets position, rotation and scale in place, keeping the `pos` and `scale` objects and without marking the
+        object as moved. For temporary changes like interpolation, re-indexing is up to the caller"""
+        if self.pool is None:
+            self._pos._set(x, y)
+            self._scale._set(sx, sy)
+            self._rotation = rotation
+        else:
+            pool, index = self.pool, self.index
+            pool._pos[index] = x, y
+            pool._scale[index] = sx, sy
+            pool._rotation[index] = rotation
 
 
 class Renderer(Component):
     image: pygame.Surface
     rect: Rect
+    # Renderers on higher layers are drawn on top, within a layer sprites are grouped by their `texture`
+    layer: int = 0
+
+    @property
+    def texture(self) -> Optional[pygame.Surface]:
+        """Surface the image is rendered from, None if that is the image itself. Sprites of the same texture, e.g. the
+        images of one atlas page, are drawn together"""
+        return None
+
+    @property
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """World (left, top, right, bottom) bounds containing `rect`, used for culling.
+
+        Subclasses should compute them without rendering the image."""
+        rect = self.rect
+        if rect is None:
+            return None
+        return rect.pos1.x, rect.pos1.y, rect.pos2.x, rect.pos2.y
 
 
 class CachedRenderer(Renderer):
+    """A Renderer caching its rendered images in `cache`, which is shared by all CachedRenderers so their images are
+    bounded together. Entries are keyed by the id of the renderer and dropped with it.
+
+    `_get_args` has to return everything the image depends on, `_get_placement` whatever else the rect depends on, so
+    moving a renderer doesn't render a new image."""
+    cache: ClassVar[SurfaceCache] = rendered_images
+
     def __init__(self, game_object: GameObject):
         super().__init__(game_object)
-        self._cache: Dict[Hashable, Tuple[pygame.Surface, Rect]] = {}
+        self._rect_key: Hashable = None
+        self._rect: Optional[Rect] = None
 
     def _get_args(self) -> Hashable:
         raise NotImplementedError
 
+    def _get_placement(self) -> Hashable:
+        return None
+
     def _render(self, args: Hashable) -> pygame.Surface:
         raise NotImplementedError
 
@@ -52,36 +179,50 @@ class CachedRenderer(Renderer):
     def _set_image(self, value: Any) -> bool:
         pass
 
+    def _invalidate(self):
+        """Drops all cached images, call whenever the rendered images change"""
+        self.cache.drop_owned(self)
+        self._rect_key = self._rect = None
+        scene = self.game_object.scene
+        if scene is not None:
+            scene.moved_objects.add(self.game_object)
+
+    def _get_image(self, args: Hashable) -> pygame.Surface:
+        key = id(self), args
+        img = self.cache.get(key)
+        if img is None:
+            with profiler.scope("renderer.render_miss"):
+                img = self._render(args)
+            self.cache.put(key, img, self)
+        return img
+
     @property
     def image(self):
-        args = self._get_args()
-        if args not in self._cache:
-            img = self._render(args)
-            rect = self._render_rect(args, img)
-        else:
-            img, _ = self._cache[args]
-        return img
+        return self._get_image(self._get_args())
 
     @image.setter
     def image(self, value: Any):
         r = self._set_image(value)
         if not r:
             raise TypeError(f"Can't set 'image' attribute of class '{self.__class__.__name__}'")
-        self._cache = {}
+        self._invalidate()
 
     @property
     def rect(self):
         args = self._get_args()
-        if args not in self._cache:
-            img = self._render(args)
-            rect = self._render_rect(args, img)
-            self._cache[args] = img, rect
-        else:
-            _, rect = self._cache[args]
-        return rect
+        key = args, self._get_placement()
+        if key != self._rect_key:
+            self._rect = self._render_rect(args, self._get_image(args))
+            self._rect_key = key
+        return self._rect
 
 
 class TransformedImageRenderer(CachedRenderer):
+    """Renders an image scaled and rotated by the Transform.
+
+    Images are taken from `sprite_cache`, which is shared by all renderers using the same source Surface. Set it to
+    None to render into `cache` instead."""
+    sprite_cache: ClassVar[Optional[TransformedSpriteCache]] = shared_sprites
     _image: pygame.Surface
     offset: Vector
 
@@ -90,40 +231,98 @@ class TransformedImageRenderer(CachedRenderer):
         self._image = load_image("")
         self.offset = Vector(0, 0)
 
-    def _get_args(self) -> Tuple[Tuple[float, float], Tuple[float, float], float]:
+    def _get_args(self) -> Tuple[Tuple[float, float], float]:
         transform: Transform = self.game_object.transform
-        return tuple(round(transform.pos, 2)), tuple(round(transform.scale, 2)), round(transform.rotation, 2)
+        if self.sprite_cache is not None:
+            return self.sprite_cache.quantize(tuple(transform.scale), transform.rotation)
+        return tuple(round(transform.scale, 2)), round(transform.rotation, 2)
+
+    def _get_image(self, args: Hashable) -> pygame.Surface:
+        if self.sprite_cache is not None:
+            scale, rotation = args
+            return self.sprite_cache.get(self._image, scale, rotation)
+        return super()._get_image(args)
+
+    @property
+    def texture(self) -> pygame.Surface:
+        return self._image.get_abs_parent()
+
+    def _get_placement(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        return tuple(self.game_object.transform.pos), tuple(self.offset)
 
     def _render(self, args: Hashable):
-        pos, scale, rotation = args
-        return pygame.transform.rotate(pygame.transform.scale(self._image, Vector(scale) @ self._image.get_size()), rotation)
+        scale, rotation = args
+        return transform_sprite(self._image, scale, rotation)
 
     def _render_rect(self, args: Hashable, img: pygame.Surface):
-        pos, scale, rotation = args
+        scale, rotation = args
         scale = Vector(scale)
+        pos = self.game_object.transform.pos
         wh: Vector = scale / self._image.get_size() @ img.get_size()
         r = Rect.from_xywh(pos - (wh / 2) + self.offset.change_rotation(math.radians(rotation)), wh)
         return r
 
+    @property
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        transform: Transform = self.game_object.transform
+        if transform is None:
+            return None
+        (sx, sy), rotation = self._get_args()
+        w, h = self._image.get_size()
+        a = math.radians(rotation)
+        cos, sin = abs(math.cos(a)), abs(math.sin(a))
+        # Pixel size of the rotated image, converted to world units like `_render_rect` does, plus a margin for
+        # pixel rounding
+        pw, ph = w * sx, h * sy
+        half_w = (cos * pw + sin * ph + 2) * abs(sx) / w * 0.51
+        half_h = (sin * pw + cos * ph + 2) * abs(sy) / h * 0.51
+        x, y = transform.pos + self.offset.change_rotation(a)
+        return x - half_w, y - half_h, x + half_w, y + half_h
+
     def _set_image(self, value: pygame.Surface):
         self._image = value
         return True
 
 
-class SolidColorRenderer(TransformedImageRenderer):
+class PolygonRenderer(Renderer):
+    """A Renderer drawn as a filled polygon straight onto the screen, without any image"""
+    image = None
+    color: Color
+
+    @property
+    def polygon(self) -> Optional[Tuple[Tuple[float, float], ...]]:
+        """The corners in world space, or None if there is nothing to draw"""
+        raise NotImplementedError
+
+    def _moved(self):
+        """Has the scene re-index the bounds, call whenever the polygon changes other than through the Transform"""
+        scene = self.game_object.scene
+        if scene is not None:
+            scene.moved_objects.add(self.game_object)
+
+    @property
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        polygon = self.polygon
+        if polygon is None:
+            return None
+        xs, ys = zip(*polygon)
+        return min(xs), min(ys), max(xs), max(ys)
+
+    @property
+    def rect(self) -> Optional[Rect]:
+        bounds = self.bounds
+        return None if bounds is None else Rect(bounds[:2], bounds[2:])
+
+
+class SolidColorRenderer(PolygonRenderer):
+    """A rectangle of a single color, following the Transform like a TransformedImageRenderer would"""
     _color: Color
+    _offset: Vector
 
     def __init__(self, game_object: GameObject):
         super().__init__(game_object)
         self._color = None
-
-    @property
-    def resolution(self) -> Tuple[int, int]:
-        return self._image.get_size()
-
-    @resolution.setter
-    def resolution(self, value: Tuple[int, int]):
-        self._image = pygame.transform.scale(self._image, value)
+        self._offset = Vector(0, 0)
 
     @property
     def color(self):
@@ -131,8 +330,38 @@ class SolidColorRenderer(TransformedImageRenderer):
 
     @color.setter
     def color(self, value: Color):
+        # Without a color there is no polygon, so the bounds may appear or vanish
         self._color = value
-        self._image.fill(value.rgb_255)
+        self._moved()
+
+    @property
+    def offset(self) -> Vector:
+        return self._offset
+
+    @offset.setter
+    def offset(self, value: Vector):
+        self._offset = value
+        self._moved()
+
+    @property
+    def polygon(self) -> Optional[Tuple[Tuple[float, float], ...]]:
+        transform: Transform = self.game_object.transform
+        if transform is None or self._color is None:
+            return None
+        scale = transform.scale
+        sx, sy = scale.x, scale.y
+        # The same world size a TransformedImageRenderer with this scale has
+        hw, hh = sx * sx / 2, sy * sy / 2
+        a = math.radians(transform.rotation)
+        cos, sin = math.cos(a), math.sin(a)
+        # Rotates like Vector.change_rotation, which is counterclockwise on screen like pygame.transform.rotate.
+        # Done on plain floats, this runs for every solid color renderer in every frame
+        pos, offset = transform.pos, self._offset
+        x, y, ox, oy = pos.x, pos.y, offset.x, offset.y
+        x += ox * cos + oy * sin
+        y += oy * cos - ox * sin
+        return tuple((x + cx * cos + cy * sin, y - cx * sin + cy * cos)
+                     for cx, cy in ((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh)))
 
 
 class Collider(Component):
@@ -141,18 +370,65 @@ class Collider(Component):
 
 
 class RectCollider(Collider):
-    rect: Rect
+    """A rectangular collider, either at `rect` in world space or at `local_rect` relative to the position of the
+    GameObject's Transform, moving with it. Setting one of them clears the other, `rect` is always in world space."""
+    _rect: Optional[Rect]
+    _local_rect: Optional[Rect]
 
     def __init__(self, game_object: GameObject):
         super().__init__(game_object)
-        self.rect = None
+        self._rect = None
+        self._local_rect = None
+
+    @property
+    def rect(self) -> Optional[Rect]:
+        if self._local_rect is None:
+            return self._rect
+        bounds = self.bounds
+        return Rect(bounds[:2], bounds[2:])
+
+    @rect.setter
+    def rect(self, value: Optional[Rect]):
+        self._rect, self._local_rect = value, None
+        self._moved()
+
+    @property
+    def local_rect(self) -> Optional[Rect]:
+        return self._local_rect
+
+    @local_rect.setter
+    def local_rect(self, value: Optional[Rect]):
+        self._rect, self._local_rect = None, value
+        self._moved()
+
+    def _moved(self):
+        # Re-indexed by the scene with the next `update_bounds`
+        scene = self.game_object.scene
+        if scene is not None:
+            scene.moved_objects.add(self.game_object)
+
+    @property
+    def bounds(self) -> Optional[Tuple[float, float, float, float]]:
+        """The (left, top, right, bottom) bounds in world space"""
+        local = self._local_rect
+        if local is None:
+            rect = self._rect
+            return None if rect is None else (rect.pos1.x, rect.pos1.y, rect.pos2.x, rect.pos2.y)
+        transform = self.game_object.transform
+        x, y = (0, 0) if transform is None else transform.pos
+        return local.pos1.x + x, local.pos1.y + y, local.pos2.x + x, local.pos2.y + y
 
     def collide_with(self, other: Collider) -> bool:
-        if self.rect is None:
+        rect = self.rect
+        if rect is None:
             return False
         if isinstance(other, RectCollider):
-            return self.rect.collide_rect(other.rect)
+            other_rect = other.rect
+            if other_rect is None:
+                return False
+            return rect.collide_rect(other_rect)
         return NotImplemented
 
 
 from game_object import GameObject
+from transform_pool import TransformPool
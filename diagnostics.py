@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import time
+from typing import Dict, Callable, Any, Optional
+
+
+class Diagnostics:
+    """Counts events per frame and reports them as one summary line per kind of event, e.g.
+    "1,243 renderers culled (off-screen)", instead of a print per event and frame.
+
+    A kind is reported at most once every `interval` seconds, and only if its line changed since it was last reported.
+    `emit` receives the lines, it is `print` by default."""
+
+    def __init__(self, interval: float = 1., emit: Callable[[str], Any] = print):
+        self.interval = interval
+        self.emit = emit
+        # Counts of the frame in progress and of the last complete one, by event
+        self.counts: Dict[str, int] = {}
+        self.last_frame: Dict[str, int] = {}
+        self._examples: Dict[str, Any] = {}
+        self._reported: Dict[str, str] = {}
+        self._reported_at: Dict[str, float] = {}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.last_frame})"
+
+    def count(self, event: str, subject: Any = None, n: int = 1):
+        """Counts `n` occurrences of `event` in this frame, `subject` is mentioned as an example"""
+        self.counts[event] = self.counts.get(event, 0) + n
+        if subject is not None and event not in self._examples:
+            self._examples[event] = subject
+
+    def end_frame(self):
+        now = time.monotonic()
+        for event, n in self.counts.items():
+            if now - self._reported_at.get(event, -self.interval) < self.interval:
+                continue
+            example: Optional[Any] = self._examples.get(event)
+            line = f"{n:,} {event}" + ("" if example is None else f", e.g. '{example}'")
+            if self._reported.get(event) != line:
+                self.emit(line)
+                self._reported[event] = line
+                self._reported_at[event] = now
+        self.last_frame = self.counts
+        self.counts = {}
+        self._examples.clear()
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Dict, Tuple, List, Optional, Hashable, Iterable, Set
+
+import pygame
+
+MAX_REGIONS = 32
+
+
+def merge_rects(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+    """Merges overlapping rects until none overlap. If more than `MAX_REGIONS` are left, rects close to each other
+    are merged in bands from top to bottom, and so many rects that sorting them out would take longer than redrawing
+    are merged into one"""
+    if len(rects) > 16 * MAX_REGIONS:
+        return [rects[0].unionall(rects[1:])]
+    merged = _merge_overlapping(rects)
+    if len(merged) > MAX_REGIONS:
+        merged.sort(key=lambda rect: (rect.top, rect.left))
+        band = -(-len(merged) // MAX_REGIONS)
+        merged = _merge_overlapping([merged[i].unionall(merged[i + 1:i + band]) for i in range(0, len(merged), band)])
+    return merged
+
+
+def _merge_overlapping(rects: List[pygame.Rect]) -> List[pygame.Rect]:
+    merged: List[pygame.Rect] = []
+    for rect in rects:
+        rect = rect.copy()
+        while True:
+            i = rect.collidelist(merged)
+            if i == -1:
+                break
+            rect.union_ip(merged.pop(i))
+        merged.append(rect)
+    return merged
+
+
+class DirtyRectTracker:
+    """Remembers where every sprite was drawn and which renderers changed since, to find the regions of the screen
+    that have to be redrawn without looking at the sprites that didn't change.
+
+    A frame starts with `changed`. If it returns None everything is redrawn and recorded with `redrawn`, otherwise
+    `update` turns the changed renderers into the regions to redraw."""
+    # Width and height of the largest sprite drawn since the last complete redraw
+    max_size: Tuple[int, int]
+    _rects: Dict[Hashable, pygame.Rect]
+    _changed: Set[Hashable]
+    _frame_key: Hashable
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Forces the next frame to be redrawn completely"""
+        self.max_size = 0, 0
+        self._rects = {}
+        self._changed = set()
+        self._frame_key = None
+
+    def mark(self, renderers: Iterable[Hashable]):
+        """Records that `renderers` may look different, be somewhere else, or be gone. Ignored until a frame was
+        recorded with `redrawn`, which draws everything anyway"""
+        if self._frame_key is not None:
+            self._changed.update(renderers)
+
+    def changed(self, frame_key: Hashable) -> Optional[Set[Hashable]]:
+        """Takes the renderers marked since the last frame, or None if everything has to be redrawn, which is the case
+        whenever `frame_key` (e.g. screen size, background and camera) changed"""
+        if frame_key != self._frame_key:
+            return None
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def redrawn(self, frame_key: Hashable, sprites: Iterable[Tuple[Hashable, pygame.Rect]]):
+        """Records a complete redraw, with the screen rect of every sprite drawn"""
+        self._frame_key = frame_key
+        self._rects = dict(sprites)
+        self._changed = set()
+        self.max_size = max((r.w for r in self._rects.values()), default=0), \
+            max((r.h for r in self._rects.values()), default=0)
+
+    def update(self, changed: Iterable[Hashable], sprites: Dict[Hashable, pygame.Rect]) -> List[pygame.Rect]:
+        """Takes the renderers returned by `changed` and the screen rects of those of them that are still drawn,
+        returns the merged regions covering where they were and are now"""
+        dirty = []
+        for renderer in changed:
+            old = self._rects.pop(renderer, None)
+            if old is not None:
+                dirty.append(old)
+            rect = sprites.get(renderer)
+            if rect is not None:
+                self._rects[renderer] = rect
+                dirty.append(rect)
+                self.max_size = max(self.max_size[0], rect.w), max(self.max_size[1], rect.h)
+        return merge_rects(dirty)
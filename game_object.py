@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from typing import List, ClassVar, Tuple, Type, TypeVar, Optional
+import itertools
+import weakref
+from typing import List, ClassVar, Tuple, Type, TypeVar, Optional, Dict, Iterator
 
 
 class NotFoundError(ValueError):
@@ -15,35 +17,153 @@ class ComponentNotFound(NotFoundError):
     pass
 
 
+class _Entry(weakref.ref):
+    __slots__ = ("name", "tag")
+
+
+class GameObjectRegistry:
+    """Index of living GameObjects by name and tag.
+
+    Only weak references are held, dead GameObjects drop out on their own. Objects sharing a name or tag are kept in
+    the order they were registered (or renamed/retagged)."""
+
+    def __init__(self):
+        self._by_name: Dict[str, Dict[_Entry, None]] = {}
+        self._by_tag: Dict[str, Dict[_Entry, None]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._by_name.values())
+
+    def __iter__(self) -> Iterator[GameObject]:
+        for bucket in list(self._by_name.values()):
+            yield from self._alive(bucket)
+
+    @staticmethod
+    def _alive(bucket: Dict[_Entry, None]) -> List[GameObject]:
+        return [obj for obj in (entry() for entry in list(bucket)) if obj is not None]
+
+    @staticmethod
+    def _add(index: Dict[str, Dict[_Entry, None]], key: Optional[str], entry: _Entry):
+        if key is not None:
+            index.setdefault(key, {})[entry] = None
+
+    @staticmethod
+    def _remove(index: Dict[str, Dict[_Entry, None]], key: Optional[str], entry: _Entry):
+        if key is not None:
+            bucket = index[key]
+            del bucket[entry]
+            if not bucket:
+                del index[key]
+
+    def register(self, obj: GameObject) -> _Entry:
+        entry = _Entry(obj, self._discard)
+        entry.name, entry.tag = obj.name, obj.tag
+        self._add(self._by_name, entry.name, entry)
+        self._add(self._by_tag, entry.tag, entry)
+        return entry
+
+    def _discard(self, entry: _Entry):
+        self._remove(self._by_name, entry.name, entry)
+        self._remove(self._by_tag, entry.tag, entry)
+
+    def rename(self, entry: _Entry, name: str):
+        self._remove(self._by_name, entry.name, entry)
+        entry.name = name
+        self._add(self._by_name, name, entry)
+
+    def retag(self, entry: _Entry, tag: Optional[str]):
+        self._remove(self._by_tag, entry.tag, entry)
+        entry.tag = tag
+        self._add(self._by_tag, tag, entry)
+
+    def find_all_by_name(self, name: str) -> List[GameObject]:
+        return self._alive(self._by_name.get(name, {}))
+
+    def find_all_by_tag(self, tag: str) -> List[GameObject]:
+        return self._alive(self._by_tag.get(tag, {}))
+
+
 class GameObject:
-    _game_objects: ClassVar[List[GameObject]]
-    name: str
-    tag: str = None
+    _registry: ClassVar[GameObjectRegistry] = GameObjectRegistry()
+    _name_counter: ClassVar[Iterator[int]] = itertools.count()
+    _entry: Optional[_Entry] = None
+    _name: str
+    _tag: Optional[str] = None
     components: List[Component]
     children: List[GameObject]
+    scene: Optional[GameScene]
+
+    # Components indexed by every class in their MRO, in the order they were added
+    _components_by_type: Dict[type, Tuple[Component, ...]]
+    _transform: Optional[Transform]
 
     def __init__(self, name=None):
         if name is None:
-            name = "GameObject" + str(len(self._game_objects))
+            name = "GameObject" + str(next(self._name_counter))
         self.name = name
         self.components = []
+        self.scene = None
+        self._components_by_type = {}
+        self._transform = None
+        self._entry = self._registry.register(self)
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+        if self._entry is not None:
+            self._registry.rename(self._entry, value)
+
+    @property
+    def tag(self) -> Optional[str]:
+        return self._tag
+
+    @tag.setter
+    def tag(self, value: Optional[str]):
+        self._tag = value
+        if self._entry is not None:
+            self._registry.retag(self._entry, value)
 
     def add_component(self, component_class: Type[T]) -> T:
-        self.components.append(component_class(self))
-        return self.components[-1]
+        component = component_class(self)
+        self.components.append(component)
+        self._index_component(component)
+        if self.scene is not None:
+            self.scene.on_component_added(component)
+        return component
+
+    def remove_component(self, component: Component):
+        self.components.remove(component)
+        self._index_component(component)
+        if self.scene is not None:
+            self.scene.on_component_removed(component)
+
+    def _index_component(self, component: Component):
+        """Rebuilds the index entries of all classes `component` is an instance of"""
+        for cls in type(component).__mro__[:-1]:
+            matching = tuple(c for c in self.components if isinstance(c, cls))
+            if matching:
+                self._components_by_type[cls] = matching
+            else:
+                self._components_by_type.pop(cls, None)
+        transforms = self._components_by_type.get(Transform)
+        self._transform = transforms[0] if transforms else None
 
     def get_components(self, component_class: Type[T]) -> List[T]:
-        return [c for c in self.components if isinstance(c, component_class)]
+        return list(self._components_by_type.get(component_class, ()))
 
     def get_component(self, component_class: Type[T]) -> T:
-        r = self.get_components(component_class)
+        r = self._components_by_type.get(component_class)
         if not r:
             raise ComponentNotFound(component_class)
         return r[0]
 
     @property
     def renderers(self) -> Tuple[Renderer, ...]:
-        return tuple(c for c in self.components if isinstance(c, Renderer))
+        return self._components_by_type.get(Renderer, ())
 
     @property
     def renderer(self) -> Renderer:
@@ -51,27 +171,30 @@ class GameObject:
 
     @property
     def transform(self) -> Optional[Transform]:
-        try:
-            return self.get_component(Transform)
-        except ComponentNotFound:
-            return
+        return self._transform
 
     @classmethod
     def find_by_name(cls, name: str):
-        for go in cls._game_objects:
-            if go.name == name:
-                return go
+        for go in cls._registry.find_all_by_name(name):
+            return go
         else:
             raise GameObjectNotFound(f"Can't find any GameObject with name {name}")
 
     @classmethod
     def find_by_tag(cls, tag: str):
-        for go in cls._game_objects:
-            if go.tag == tag:
-                return go
+        for go in cls._registry.find_all_by_tag(tag):
+            return go
         else:
             raise GameObjectNotFound(f"Can't find any GameObject with tag {tag}")
 
+    @classmethod
+    def find_all_by_name(cls, name: str) -> List[GameObject]:
+        return cls._registry.find_all_by_name(name)
+
+    @classmethod
+    def find_all_by_tag(cls, tag: str) -> List[GameObject]:
+        return cls._registry.find_all_by_tag(tag)
+
 
 from components import Renderer, Transform, Component
 
@@ -1,69 +1,418 @@
 from __future__ import annotations
 
-import math
-from typing import List, Iterable
+import itertools
+import weakref
+from typing import List, Iterable, Optional, Union, Tuple, Dict, Set, Iterator, Any, Hashable, Callable
 
+import numpy as np
 import pygame
 from pygame_application import Scene
 
+from camera import Camera
 from color import Color
 from color import ColorType
+from components import Component, Transform, RectCollider, Renderer, PolygonRenderer
+from diagnostics import Diagnostics
+from dirty_rects import DirtyRectTracker
 from game_object import GameObject
+from profiler import profiler
 from rect import Rect
+from resource_loader import preload, display_format, convert_for_display
+from spatial_index import SpatialIndex, UniformGrid, rect_bounds
+from systems import Scheduler
+from sprite_cache import SurfaceCache, mip_level
+from transform_pool import TransformPool
 from typecheck import typecheck
-from vector import Vector
+from vector import VectorArray
+
+# Colors remembered for the draw order of solid color renderers, see `GameScene._color_group_order`
+MAX_COLOR_GROUPS = 4096
+
+
+def _scale_sprite(source: pygame.Surface, size: Tuple[int, int], rotation: float) -> pygame.Surface:
+    img = pygame.transform.scale(mip_level(source, size), size)
+    if rotation:
+        img = pygame.transform.rotate(img, rotation)
+    # Sources not loaded through load_image, or loaded before the display changed, would be converted on every blit
+    if display_format() not in (None, (img.get_bitsize(), img.get_masks())):
+        img = convert_for_display(img)
+    return img
+
+
+def _draw_entries(screen: pygame.Surface, entries: List[Tuple[Any, Any, pygame.Rect, Renderer]]):
+    """Draws sprites with as few `blits` calls as possible and shapes directly, keeping their order"""
+    batch = []
+    clip = screen.get_clip()
+    for drawable, target, rect, _ in entries:
+        if isinstance(drawable, pygame.Surface):
+            batch.append((drawable, target))
+            continue
+        if batch:
+            screen.blits(batch, doreturn=False)
+            batch = []
+        if target is None:
+            # fill moves rects starting left of or above the surface into it instead of clipping them
+            screen.fill(drawable, rect.clip(clip))
+        else:
+            pygame.draw.polygon(screen, drawable, target)
+    if batch:
+        screen.blits(batch, doreturn=False)
+
+
+def _layered(renderers: List[Renderer], entries: Dict[Renderer, Tuple[Any, Any, pygame.Rect, Hashable]],
+             group_rank: Callable[[Hashable], int]) -> List[Tuple[int, List[Tuple[Any, Any, pygame.Rect, Renderer]]]]:
+    """The entries of `renderers` (in render order) by layer, grouped by texture or color within a layer, so
+    `_draw_entries` can batch them. Groups are drawn in the order of `group_rank` of their key"""
+    layers: Dict[int, Dict[Hashable, List[Tuple[Any, Any, pygame.Rect, Renderer]]]] = {}
+    for renderer in renderers:
+        entry = entries.get(renderer)
+        if entry is not None:
+            drawable, target, rect, key = entry
+            layers.setdefault(renderer.layer, {}).setdefault(key, []).append((drawable, target, rect, renderer))
+    ordered = []
+    for layer in sorted(layers):
+        groups = layers[layer]
+        ordered.append((layer, [entry for key in sorted(groups, key=group_rank) for entry in groups[key]]))
+    return ordered
+
+
+def _debug_marker_corner(offset: Tuple[int, int]) -> Tuple[int, int]:
+    """Top left corner of the marker of a Transform relative to its position on screen"""
+    return min(-5, offset[0] - 2), min(-5, offset[1] - 2)
+
+
+def _debug_marker(offset: Tuple[int, int]) -> pygame.Surface:
+    """A red circle at the position of a Transform and a green line in the direction it is facing"""
+    left, top = _debug_marker_corner(offset)
+    right, bottom = max(5, offset[0] + 2), max(5, offset[1] + 2)
+    marker = pygame.Surface((right - left + 1, bottom - top + 1), pygame.SRCALPHA)
+    marker.fill((0, 0, 0, 0))
+    start = -left, -top
+    pygame.draw.circle(marker, (255, 0, 0), start, 5)
+    pygame.draw.line(marker, (0, 255, 0), start, (start[0] + offset[0], start[1] + offset[1]), 3)
+    return marker
 
-Rect0011 = Rect((0, 0), (1, 1))
 
 @typecheck(typecheck_setattr=True)
 class GameScene:
     name: str
     game_objects: List[GameObject]
     background: Color
+    transforms: Optional[TransformPool]
+    colliders: SpatialIndex
+    # Renderer images scaled to their size on screen, keyed by (id of source surface, size, camera rotation). Entries
+    # are dropped with their source
+    scaled_sprites: SurfaceCache
+    # Where sprites were drawn and which renderers changed since, for `render(dirty_rects=True)`
+    dirty_regions: DirtyRectTracker
+    # World bounds of all renderers, queried with the camera view to find what is visible
+    renderer_bounds: SpatialIndex
+    # Objects whose renderer bounds have to be re-read before the next render, see `update_bounds`
+    moved_objects: Set[GameObject]
+    # Transform markers drawn in debug mode, by the screen offset of their direction line
+    debug_markers: SurfaceCache
+    # Collects what debug mode reports, e.g. how many renderers were culled
+    diagnostics: Diagnostics
+    # Runs the Systems of the scene at a fixed timestep, see `update`
+    scheduler: Scheduler
+    _render_order: Dict[Renderer, int]
+    # Draw order of the groups of sprites within a layer, by texture or color, in order of first appearance in
+    # the scene. Not only in the frame, so what is visible doesn't change how sprites stack, and a redrawn region
+    # stacks them like the rest of the screen
+    _sprite_group_order: weakref.WeakKeyDictionary
+    _color_group_order: Dict[Tuple[int, ...], int]
+    _group_counter: Iterator[int]
+    _render_counter: Iterator[int]
+    # Bit size and masks of the screen the scaled sprites were made for
+    _screen_format: Optional[tuple]
 
-    def __init__(self, name: str, game_objects: Iterable[GameObject], background: ColorType):
+    def __init__(self, name: str, game_objects: Iterable[GameObject], background: ColorType, *,
+                 pooled_transforms: bool = False, spatial_index: SpatialIndex = None,
+                 sprite_cache_bytes: int = 64 * 2 ** 20, culling_index: SpatialIndex = None,
+                 fixed_step: float = 1 / 60, max_steps: int = 5):
         self.name = name
-        self.game_objects = list(game_objects)
+        self.game_objects = []
         self.background = Color(background)
+        self.transforms = TransformPool() if pooled_transforms else None
+        self.colliders = UniformGrid() if spatial_index is None else spatial_index
+        self.scaled_sprites = SurfaceCache(sprite_cache_bytes)
+        self.dirty_regions = DirtyRectTracker()
+        self.renderer_bounds = UniformGrid(4.) if culling_index is None else culling_index
+        self.moved_objects = set()
+        self.debug_markers = SurfaceCache(4 * 2 ** 20)
+        self.diagnostics = Diagnostics()
+        self.scheduler = Scheduler(self, fixed_step, max_steps)
+        self._render_order = {}
+        self._render_counter = itertools.count()
+        self._sprite_group_order = weakref.WeakKeyDictionary()
+        self._color_group_order = {}
+        self._group_counter = itertools.count()
+        self._screen_format = None
+        for obj in game_objects:
+            self.add_game_object(obj)
 
-    def render(self, screen: pygame.Surface, screen_rect: Rect, *, debug=False):
-        screen.fill(self.background.rgb_255)
-        for obj in self.game_objects:
+    def add_game_object(self, obj: GameObject):
+        self.game_objects.append(obj)
+        obj.scene = self
+        for component in obj.components:
+            self.on_component_added(component)
+
+    def remove_game_object(self, obj: GameObject):
+        self.game_objects.remove(obj)
+        for component in obj.components:
+            self.on_component_removed(component)
+        obj.scene = None
+
+    def on_component_added(self, component: Component):
+        if self.transforms is not None and isinstance(component, Transform):
+            self.transforms.add(component)
+        if isinstance(component, RectCollider):
+            self.colliders.insert(component)
+        if isinstance(component, Renderer):
+            self._render_order[component] = next(self._render_counter)
+            self.renderer_bounds.insert(component)
+        self.moved_objects.add(component.game_object)
+        self.scheduler.invalidate()
+
+    def on_component_removed(self, component: Component):
+        if self.transforms is not None and isinstance(component, Transform):
+            self.transforms.remove(component)
+        if isinstance(component, RectCollider):
+            self.colliders.remove(component)
+        if isinstance(component, Renderer):
+            del self._render_order[component]
+            self.renderer_bounds.remove(component)
+            self.dirty_regions.mark((component,))
+        self.moved_objects.add(component.game_object)
+        self.scheduler.invalidate()
+
+    def update(self, dt: float) -> int:
+        """Advances the systems of the scene by `dt` seconds, returns the number of fixed steps run"""
+        return self.scheduler.advance(dt)
+
+    def update_bounds(self):
+        """Re-indexes the renderers and colliders of all objects in `moved_objects`.
+
+        Changing a Transform, also in place like `pos.x += 1`, adds its object there, and so do writes to the arrays of
+        `transforms`. Runs before every render and before every system step, call it before querying `colliders` in
+        between."""
+        if self.transforms is not None:
+            self.moved_objects.update(transform.game_object for transform in self.transforms.changed())
+        for obj in self.moved_objects:
+            self.dirty_regions.mark(obj.renderers)
             for renderer in obj.renderers:
-                if renderer.image is not None and renderer.rect is not None:
-                    rel = renderer.rect.relative_rect(screen_rect)
-                    if not rel.collide_rect(Rect0011):
-                        if debug:
-                            print(f"Did not render '{renderer}' of object '{obj}' (Not on screen)")
-                        continue
-                    rect_on_screen = rel.scale_wh(screen.get_size())
-                    img = pygame.transform.scale(renderer.image, rect_on_screen.wh.rounded)
-                    screen.blit(img, rect_on_screen.xy.rounded)
+                if renderer in self.renderer_bounds:
+                    self.renderer_bounds.update(renderer)
+            for collider in obj.get_components(RectCollider):
+                if collider in self.colliders:
+                    self.colliders.update(collider)
+        self.moved_objects.clear()
+
+    def refresh_bounds(self):
+        """Re-indexes all renderers and colliders"""
+        self.renderer_bounds.refresh()
+        self.colliders.refresh()
+        self.moved_objects.clear()
+        # Which renderers changed is unknown
+        self.dirty_regions.reset()
+
+    def render(self, screen: pygame.Surface, camera: Union[Camera, Rect], *, debug=False, dirty_rects=False
+               ) -> Optional[List[pygame.Rect]]:
+        """Draws the scene as seen by `camera` onto `screen`.
+
+        With `dirty_rects`, only the regions that changed since the last such call are redrawn, and returned to be
+        passed to `pygame.display.update`. Changes are found through `moved_objects` like for `update_bounds`, a
+        renderer that looks different without its object being marked there isn't redrawn. A change of screen size,
+        background or camera, and `debug` drawing always redraw everything."""
+        lap = profiler.clock()
+        if isinstance(camera, Rect):
+            camera = Camera.from_rect(camera)
+        camera.update(screen.get_size())
+        screen_format = screen.get_bitsize(), screen.get_masks()
+        if screen_format != self._screen_format:
+            # e.g. after the window was resized, scaled sprites are converted again on demand
+            self.scaled_sprites.clear()
+            self._screen_format = screen_format
+
+        self.update_bounds()
+        frame_key = screen.get_size(), screen_format, self.background.rgb_255, \
+            tuple(camera.matrix.ravel().tolist()), tuple(camera.offset.tolist())
+        if len(self._color_group_order) > MAX_COLOR_GROUPS:
+            # e.g. animated colors, restacks them
+            self._color_group_order.clear()
+            self.dirty_regions.reset()
+        changed = self.dirty_regions.changed(frame_key) if dirty_rects and not debug else None
+        if changed is not None:
+            return self._render_dirty(screen, camera, changed, lap)
+
+        view = camera.view_bounds
+        candidates = sorted(self.renderer_bounds.query_rect(Rect(view[:2], view[2:])), key=self._render_order.__getitem__)
+        if debug:
+            for obj in self.game_objects:
+                if not obj.renderers:
+                    self.diagnostics.count("objects not rendered (no renderer)", obj)
+            # Culled by the index, `_entries` counts those only culled at pixel precision
+            culled = len(self.renderer_bounds) - len(candidates)
+            if culled:
+                self.diagnostics.count("renderers culled (off-screen)", n=culled)
+        lap = profiler.lap("render.cull", lap)
+        entries = self._entries(screen, camera, candidates, debug)
+        lap = profiler.lap("render.scale", lap)
+        ordered = _layered(candidates, entries, self._group_rank)
+        if dirty_rects and not debug:
+            self.dirty_regions.redrawn(frame_key, ((renderer, entry[2]) for renderer, entry in entries.items()))
+        else:
+            self.dirty_regions.reset()
+        lap = profiler.lap("render.sort", lap)
+        screen.fill(self.background.rgb_255)
+        lap = profiler.lap("render.fill", lap)
+        for _, layer_entries in ordered:
+            _draw_entries(screen, layer_entries)
+        lap = profiler.lap("render.blit", lap)
+
+        if debug:
+            transforms = []
+            for obj in self.game_objects:
+                if obj.transform:
+                    transforms.append(obj.transform)
                 else:
+                    self.diagnostics.count("objects not debugged (no transform)", obj)
+            if transforms:
+                pos = np.array([tuple(t.pos) for t in transforms], dtype=np.float64)
+                directions = VectorArray.from_polar(np.radians([-t.rotation for t in transforms]), 1)
+                p1 = np.rint(camera.points_to_screen(pos)).astype(int)
+                p2 = np.rint(camera.points_to_screen(pos + directions.data)).astype(int)
+                markers = []
+                for (x, y), offset in zip(p1.tolist(), map(tuple, (p2 - p1).tolist())):
+                    marker = self.debug_markers.get_or_create(offset, lambda: _debug_marker(offset))
+                    left, top = _debug_marker_corner(offset)
+                    markers.append((marker, (x + left, y + top)))
+                screen.blits(markers, doreturn=False)
+            self.diagnostics.end_frame()
+            profiler.lap("render.debug", lap)
+        return [screen.get_rect()] if dirty_rects else None
+
+    def _render_dirty(self, screen: pygame.Surface, camera: Camera, changed: Set[Renderer], lap: float
+                      ) -> List[pygame.Rect]:
+        """Redraws the regions of the screen covering the old and new rects of `changed` renderers. Only the changed
+        renderers and those overlapping a region, found through `renderer_bounds`, are looked at"""
+        drawn = self._entries(screen, camera, [r for r in changed if r in self._render_order], False)
+        regions = self.dirty_regions.update(changed, {renderer: entry[2] for renderer, entry in drawn.items()})
+        lap = profiler.lap("render.scale", lap)
+        if camera.rotation % 90 == 0:
+            # Sprites are drawn as the box `Camera.bounds_to_screen` maps their world bounds to, which is exactly
+            # where those bounds are on screen, only rounding can make it a pixel larger
+            pad_x = pad_y = 1
+        else:
+            # The box is centered on the mapped world bounds but larger than them, so a sprite overlapping a region
+            # has its world bounds within its screen size of the region
+            pad_x, pad_y = self.dirty_regions.max_size
+        for region in regions:
+            bounds = camera.pixel_bounds(region.left - pad_x, region.top - pad_y, region.right + pad_x,
+                                         region.bottom + pad_y)
+            candidates = sorted(self.renderer_bounds.query_rect(Rect(bounds[:2], bounds[2:])),
+                                key=self._render_order.__getitem__)
+            lap = profiler.lap("render.cull", lap)
+            entries = self._entries(screen, camera, candidates, False)
+            lap = profiler.lap("render.scale", lap)
+            screen.set_clip(region)
+            screen.fill(self.background.rgb_255, region)
+            lap = profiler.lap("render.fill", lap)
+            for _, layer_entries in _layered(candidates, entries, self._group_rank):
+                _draw_entries(screen, [entry for entry in layer_entries if region.colliderect(entry[2])])
+            lap = profiler.lap("render.blit", lap)
+        screen.set_clip(None)
+        return regions
+
+    def _group_rank(self, key: Hashable) -> int:
+        """Position of the sprite group of `key` within a layer, see `_sprite_group_order`"""
+        order = self._sprite_group_order if isinstance(key, pygame.Surface) else self._color_group_order
+        rank = order.get(key)
+        if rank is None:
+            rank = order[key] = next(self._group_counter)
+        return rank
+
+    def _entries(self, screen: pygame.Surface, camera: Camera, renderers: Iterable[Renderer], debug: bool
+                 ) -> Dict[Renderer, Tuple[Any, Any, pygame.Rect, Hashable]]:
+        """renderer -> (surface or color, blit position or polygon, rect on screen, group key) of the `renderers`
+        visible on `screen`, scaling their images as needed"""
+        width, height = screen.get_size()
+        image_rotation = round(camera.image_rotation, 2)
+        sprites, shapes = [], []
+        for renderer in renderers:
+            if isinstance(renderer, PolygonRenderer):
+                polygon = renderer.polygon
+                if polygon is not None:
+                    shapes.append((renderer, polygon))
+                    continue
+            else:
+                image, rect = renderer.image, renderer.rect
+                if image is not None and rect is not None:
+                    sprites.append((renderer, image, rect_bounds(rect)))
+                    continue
+            if debug:
+                self.diagnostics.count("renderers not rendered (no image or rect)", renderer)
+
+        entries: Dict[Renderer, Tuple[Any, Any, pygame.Rect, Hashable]] = {}
+        screen_rect = screen.get_rect()
+        if sprites:
+            centers, sizes, boxes = camera.bounds_to_screen(np.array([s[2] for s in sprites], dtype=np.float64))
+            visible = (boxes[:, 0] <= width) & (boxes[:, 2] >= 0) & (boxes[:, 1] <= height) & (boxes[:, 3] >= 0)
+            for (renderer, source, _), (cx, cy), size, on_screen in zip(
+                    sprites, centers.tolist(), np.rint(sizes).astype(int).tolist(), visible.tolist()):
+                if not on_screen:
+                    if debug:
+                        self.diagnostics.count("renderers culled (off-screen)", renderer)
+                    continue
+                size = tuple(size)
+                img = self.scaled_sprites.get_or_create(
+                    (id(source), size, image_rotation), lambda: _scale_sprite(source, size, image_rotation), source)
+                w, h = img.get_size()
+                pos = round(cx - w / 2), round(cy - h / 2)
+                texture = renderer.texture
+                entries[renderer] = img, pos, pygame.Rect(pos, (w, h)), \
+                    source.get_abs_parent() if texture is None else texture
+        if shapes:
+            points = np.rint(camera.points_to_screen(np.array([s[1] for s in shapes], dtype=np.float64)
+                                                     .reshape(-1, 2))).astype(int).reshape(len(shapes), -1, 2)
+            lows, highs = points.min(axis=1).tolist(), points.max(axis=1).tolist()
+            for (renderer, _), polygon, (x1, y1), (x2, y2) in zip(shapes, points.tolist(), lows, highs):
+                rect = pygame.Rect(x1, y1, x2 - x1, y2 - y1)
+                if not rect.colliderect(screen_rect):
                     if debug:
-                        print(f"Did not render '{renderer}' of object '{obj}' (No Image or Rect)")
-            if debug and not obj.renderers:
-                print(f"Did not render  object '{obj}' (No Renderer)")
-            if obj.transform and debug:
-                t = obj.transform
-                p1 = (screen_rect.relative_point(t.pos) @ screen.get_size()).rounded
-                p2 = (screen_rect.relative_point(t.pos + Vector.from_polar(math.radians(-t.rotation), 1)) @ screen.get_size()).rounded
-                pygame.draw.circle(screen, (255, 0, 0), p1, 5)
-                pygame.draw.line(screen, (0, 255, 0), p1, p2, 3)
-            elif debug:
-                print(f"Did not debug object '{obj}' (No Transform)")
+                        self.diagnostics.count("renderers culled (off-screen)", renderer)
+                    continue
+                color = renderer.color.rgb_255
+                # Axis aligned rectangles are filled, which is a lot cheaper than drawing a polygon
+                axis_aligned = len(polygon) == 4 and polygon[0][1] == polygon[1][1] and polygon[1][0] == polygon[2][0]
+                if axis_aligned:
+                    entries[renderer] = color, None, rect, color
+                else:
+                    # draw.polygon includes the right and bottom edge, which the filled rect doesn't
+                    rect = pygame.Rect(x1, y1, x2 - x1 + 1, y2 - y1 + 1)
+                    entries[renderer] = color, tuple(map(tuple, polygon)), rect, color
+        return entries
 
 
 class DisplayScene(Scene):
-    def __init__(self, game_scene: GameScene):
+    def __init__(self, game_scene: GameScene, assets: Iterable[str] = ()):
         self.game_scene = game_scene
-        self.screen_rect = Rect((0, 0), (10, 10))
+        self.camera = Camera.from_rect(Rect((0, 0), (10, 10)))
+        # Decoded in the background until the scene is entered
+        self.assets = preload(assets)
 
     def on_enter(self, previous_scene: 'Scene' = None, multi_id: int = None):
         pygame.display.set_caption(self.game_scene.name)
+        self.assets.result()
 
     def draw(self, screen: pygame.Surface, multi_id: int = None):
-        self.game_scene.render(screen, self.screen_rect, debug=True)
+        with profiler.scope("render"), self.game_scene.scheduler.interpolated():
+            self.game_scene.render(screen, self.camera, debug=True)
+        if profiler.overlay:
+            profiler.draw_overlay(screen)
+        profiler.end_frame()
 
     def update(self, dt: int, multi_id: int = None):
-        self.game_scene.game_objects[0].transform.rotation += dt / 100
+        with profiler.scope("update"):
+            self.game_scene.update(dt / 1000)
+
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import csv
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Deque, Iterator, Optional, Tuple
+
+import numpy as np
+import pygame
+
+PERCENTILES = (50, 95, 99)
+
+
+class FrameProfiler:
+    """Collects timings of named scopes and allocation counts per frame, keeping the last `frames` frames.
+
+    Everything is a no-op until `enable` is called. Timings are in milliseconds, the total of a frame is recorded as
+    "frame", the time between two calls of `end_frame`."""
+
+    def __init__(self, frames: int = 600):
+        self.enabled = False
+        self.overlay = False
+        self.frames: Deque[Dict[str, float]] = deque(maxlen=frames)
+        self._current: Dict[str, float] = {}
+        self._counts: Dict[str, int] = {}
+        self._frame_start = 0.
+        self._counted: Dict[type, object] = {}
+        self._font: Optional[pygame.font.Font] = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}(enabled={self.enabled}, frames={len(self.frames)})"
+
+    def enable(self, count_allocations: bool = True):
+        self.enabled = True
+        self._frame_start = time.perf_counter()
+        if count_allocations:
+            self.count_allocations(Vector, "alloc.Vector")
+            self.count_allocations(Rect, "alloc.Rect")
+
+    def disable(self):
+        self.enabled = False
+        for cls, init in self._counted.items():
+            cls.__init__ = init
+        self._counted.clear()
+
+    def count_allocations(self, cls: type, name: str):
+        """Counts calls of `cls.__init__` as `name` until the profiler is disabled"""
+        if cls in self._counted:
+            return
+        init = self._counted[cls] = cls.__init__
+        counts = self._counts
+
+        def __init__(obj, *args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            init(obj, *args, **kwargs)
+
+        cls.__init__ = __init__
+
+    def add(self, name: str, ms: float):
+        """Adds `ms` to the time of scope `name` in the current frame and counts one call of it"""
+        self._current[name] = self._current.get(name, 0.) + ms
+        self._counts[name] = self._counts.get(name, 0) + 1
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1e3)
+
+    def clock(self) -> float:
+        """Start for a series of `lap` calls, 0 when disabled"""
+        return time.perf_counter() if self.enabled else 0.
+
+    def lap(self, name: str, start: float) -> float:
+        """Adds the time since `start` to scope `name`, returns the start of the next lap.
+
+        Timing consecutive phases of a function this way doesn't need a `with` block around each of them."""
+        if not self.enabled:
+            return 0.
+        now = time.perf_counter()
+        self.add(name, (now - start) * 1e3)
+        return now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        frame = dict(self._current)
+        frame["frame"] = (now - self._frame_start) * 1e3
+        for name, count in self._counts.items():
+            frame[name + ".count" if name in self._current else name] = count
+        self.frames.append(frame)
+        self._current.clear()
+        self._counts.clear()
+        self._frame_start = now
+
+    def names(self) -> List[str]:
+        return sorted({name for frame in self.frames for name in frame})
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """p50, p95, p99 and mean of every value over the recorded frames, missing values counting as 0"""
+        result = {}
+        for name in self.names():
+            values = np.array([frame.get(name, 0.) for frame in self.frames])
+            stats = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+            stats["mean"] = float(values.mean())
+            result[name] = stats
+        return result
+
+    def dump_json(self, path: str):
+        with open(path, "w") as f:
+            json.dump({"summary": self.summary(), "frames": list(self.frames)}, f, indent=1)
+
+    def dump_csv(self, path: str):
+        """One row per frame, one column per scope or counter"""
+        names = self.names()
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, names, restval=0)
+            writer.writeheader()
+            writer.writerows(self.frames)
+
+    def draw_overlay(self, screen: pygame.Surface, pos: Tuple[int, int] = (4, 4)):
+        """Draws the summary of the timed scopes in the top left corner of `screen`"""
+        if not self.frames:
+            return
+        if self._font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self._font = pygame.font.Font(None, 18)
+        lines = [f"{name:<24} p50 {s['p50']:7.2f}  p95 {s['p95']:7.2f}  p99 {s['p99']:7.2f}"
+                 for name, s in self.summary().items() if not name.endswith(".count")]
+        x, y = pos
+        images = [self._font.render(line, True, (255, 255, 255), (0, 0, 0)) for line in lines]
+        screen.blits([(img, (x, y + i * img.get_height())) for i, img in enumerate(images)], doreturn=False)
+
+
+profiler = FrameProfiler()
+
+
+from rect import Rect
+from vector import Vector
@@ -46,11 +46,11 @@ class Rect(RectType):
         return Rect((self.pos1.x * scale[0], self.pos1.y * scale[1]), (self.pos2.x * scale[0], self.pos2.y * scale[1]))
 
     def collide_point(self, pos: VectorType) -> bool:
-        return self.pos1.x <= pos[0] <= self.pos2[1] and self.pos1.y <= pos[1] <= self.pos2.y
+        return self.pos1.x <= pos[0] <= self.pos2.x and self.pos1.y <= pos[1] <= self.pos2.y
 
     def collide_rect(self, other: Rect) -> bool:
-        return any(self.collide_point(p) for p in (other.top_left, other.top_right, other.bottom_left, other.bottom_right)) or \
-               any(other.collide_point(p) for p in (self.top_left, self.top_right, self.bottom_left, self.bottom_right))
+        return self.pos1.x <= other.pos2.x and other.pos1.x <= self.pos2.x and \
+               self.pos1.y <= other.pos2.y and other.pos1.y <= self.pos2.y
 
     def relative_rect(self, parent: Rect) -> Rect:
         p1 = self.pos1 - parent.pos1
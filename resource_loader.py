@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Tuple
+from typing import Tuple, Dict, Optional, Iterable, Callable, List
 
 import pygame
 
+from profiler import profiler
+
 
 def get_path(name: str, suffixes: Tuple[str, ...], default: str):
     if not name:
@@ -20,22 +26,295 @@ def get_path(name: str, suffixes: Tuple[str, ...], default: str):
         return default
 
 
-_image_cache = {}
+# Decoded images by path, shared between the main thread and the preloading threads
+_image_cache: Dict[str, pygame.Surface] = {}
+# Decoded images upscaled to a minimum resolution by (path, min_resolution)
+_resized_cache: Dict[Tuple[str, Tuple[int, int]], pygame.Surface] = {}
+# Shared images converted to the display format, by the same keys. Emptied when the display format changes
+_display_images: Dict[Tuple[str, Tuple[int, int]], pygame.Surface] = {}
+_display_format: Optional[Tuple] = None
+# Paths being decoded right now
+_pending: Dict[str, Future] = {}
+_cache_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+PRELOAD_WORKERS = min(4, os.cpu_count() or 1)
 
+# Number of Surfaces passed through `convert` and `convert_alpha`
+stats = dict(converted=0, converted_alpha=0)
 
-def _load_image_cached(path: str):
-    if path not in _image_cache:
-        _image_cache[path] = pygame.image.load(path)
-    return _image_cache[path]
 
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _cache_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(PRELOAD_WORKERS, thread_name_prefix="resource_loader")
+        return _executor
 
-def load_image(name: str, min_resolution=(1000, 1000)) -> pygame.Surface:
-    target_path = get_path(name, ("png",), "missing.png")
-    img: pygame.Surface = _load_image_cached(target_path).copy()
-    if img.get_width() < min_resolution[0]:
-        f = min_resolution[0] / img.get_width()
-        img = pygame.transform.scale(img, (min_resolution[0], int(img.get_height() * f)))
-    if img.get_height() < min_resolution[1]:
-        f = min_resolution[1] / img.get_height()
-        img = pygame.transform.scale(img, (int(img.get_width() * f), min_resolution[1]))
+
+def _decode(path: str) -> pygame.Surface:
+    img = None
+    try:
+        # SDL_image releases the GIL while decoding
+        img = pygame.image.load(path)
+    finally:
+        # Also when it failed, so the next load tries again instead of raising the same error from the Future
+        with _cache_lock:
+            if img is not None:
+                _image_cache[path] = img
+            _pending.pop(path, None)
     return img
+
+
+def _submit(path: str) -> Future:
+    """Returns a Future of the decoded image at `path`, starting to decode it in the background if necessary"""
+    executor = _get_executor()
+    with _cache_lock:
+        if path in _image_cache:
+            future = Future()
+            future.set_result(_image_cache[path])
+            return future
+        future = _pending.get(path)
+        if future is None:
+            future = _pending[path] = executor.submit(_decode, path)
+        return future
+
+
+def _load_image_cached(path: str) -> pygame.Surface:
+    with _cache_lock:
+        img = _image_cache.get(path)
+        future = _pending.get(path)
+    if img is not None:
+        return img
+    if future is not None:
+        # Already being preloaded, waiting for it is never slower than decoding it again
+        return future.result()
+    return _decode(path)
+
+
+class Preload(Future):
+    """Future of a set of images being loaded in the background, resolves to a dict of name -> decoded image.
+
+    Fails with the first error once all images finished loading."""
+
+    def __init__(self, names: Iterable[str], on_progress: Callable[[int, int], None] = None):
+        super().__init__()
+        self.names = tuple(dict.fromkeys(names))
+        self.loaded = 0
+        self._on_progress = on_progress
+        self._lock = threading.Lock()
+        self._results: Dict[str, pygame.Surface] = {}
+        self._error: Optional[BaseException] = None
+        if not self.names:
+            self.set_result({})
+        for name in self.names:
+            _submit(get_path(name, (".png",), "missing.png")).add_done_callback(
+                lambda future, name=name: self._image_done(name, future))
+
+    @property
+    def total(self) -> int:
+        return len(self.names)
+
+    @property
+    def progress(self) -> float:
+        """Fraction of images loaded, between 0 and 1"""
+        return self.loaded / self.total if self.names else 1.
+
+    def _image_done(self, name: str, future: Future):
+        with self._lock:
+            if future.exception() is None:
+                self._results[name] = future.result()
+            elif self._error is None:
+                self._error = future.exception()
+            self.loaded += 1
+            loaded, finished = self.loaded, self.loaded == self.total
+        if self._on_progress is not None:
+            self._on_progress(loaded, self.total)
+        if finished:
+            if self._error is None:
+                self.set_result(self._results)
+            else:
+                self.set_exception(self._error)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.loaded}/{self.total} loaded)"
+
+
+def preload(names: Iterable[str], on_progress: Callable[[int, int], None] = None) -> Preload:
+    """Starts decoding the images `names` on a thread pool, so later calls to `load_image` don't have to.
+
+    `on_progress(loaded, total)` is called from the loading threads after each image."""
+    return Preload(names, on_progress)
+
+
+def wait(names: Iterable[str], timeout: float = None) -> Dict[str, pygame.Surface]:
+    """Blocks until all images `names` are loaded, e.g. before a Scene is entered"""
+    return preload(names).result(timeout)
+
+
+def try_get(name: str, min_resolution=(1000, 1000)) -> Optional[pygame.Surface]:
+    """Like `load_image`, but returns None instead of blocking if the image isn't decoded yet.
+
+    The image is preloaded in that case, so it will be available in one of the next frames."""
+    path = get_path(name, (".png",), "missing.png")
+    with _cache_lock:
+        ready = path in _image_cache
+    if not ready:
+        _submit(path)
+        return None
+    return load_image(name, min_resolution)
+
+
+def display_format() -> Optional[Tuple]:
+    """Bit size and masks of the display Surface, None before a display mode is set"""
+    surface = pygame.display.get_surface()
+    return None if surface is None else (surface.get_bitsize(), surface.get_masks())
+
+
+def has_alpha(img: pygame.Surface) -> bool:
+    """Whether any pixel of `img` is not fully opaque"""
+    if not img.get_flags() & pygame.SRCALPHA:
+        return False
+    w, h = img.get_size()
+    # Only pixels with an alpha above 254 are set
+    return pygame.mask.from_surface(img, 254).count() < w * h
+
+
+def convert_for_display(img: pygame.Surface) -> pygame.Surface:
+    """`img` in the display format, with an alpha channel only if it has transparent pixels"""
+    if has_alpha(img):
+        stats["converted_alpha"] += 1
+        return img.convert_alpha()
+    stats["converted"] += 1
+    return img.convert()
+
+
+def load_image(name: str, min_resolution=(1000, 1000), copy: bool = False) -> pygame.Surface:
+    """Loads the image `name`, upscaled to at least `min_resolution`.
+
+    The Surface is shared with everyone loading the same image, pass `copy=True` to get one that may be drawn on.
+    Once a display mode is set, images are converted to its format, and converted again when it changes."""
+    with profiler.scope("load_image"):
+        return _load_image(name, min_resolution, copy)
+
+
+def _load_image(name: str, min_resolution: Tuple[int, int], copy: bool) -> pygame.Surface:
+    global _display_format
+    target_path = get_path(name, (".png",), "missing.png")
+    key = target_path, tuple(min_resolution)
+    with _cache_lock:
+        img = _resized_cache.get(key)
+    if img is None:
+        img = _load_image_cached(target_path)
+        if img.get_width() < min_resolution[0]:
+            f = min_resolution[0] / img.get_width()
+            img = pygame.transform.scale(img, (min_resolution[0], int(img.get_height() * f)))
+        if img.get_height() < min_resolution[1]:
+            f = min_resolution[1] / img.get_height()
+            img = pygame.transform.scale(img, (int(img.get_width() * f), min_resolution[1]))
+        with _cache_lock:
+            img = _resized_cache.setdefault(key, img)
+    fmt = display_format()
+    if fmt is not None:
+        with _cache_lock:
+            if fmt != _display_format:
+                _display_images.clear()
+                _display_format = fmt
+            converted = _display_images.get(key)
+        if converted is None:
+            converted = convert_for_display(img)
+            with _cache_lock:
+                converted = _display_images.setdefault(key, converted)
+        img = converted
+    return img.copy() if copy else img
+
+
+class Atlas:
+    """Many images packed into a few large pages, see `pack_atlas`.
+
+    Images are handed out as subsurfaces of their page, sharing its pixels. Renderers of them are grouped by the page
+    (see `Renderer.texture`), so the sprites of a page are drawn together."""
+
+    def __init__(self, pages: List[pygame.Surface], regions: Dict[str, Tuple[int, Tuple[int, int, int, int]]]):
+        self.pages = pages
+        # name -> (page index, (x, y, w, h))
+        self.regions = regions
+        self._images: Dict[str, pygame.Surface] = {}
+
+    def __repr__(self):
+        return f"{type(self).__name__}(images={len(self.regions)}, pages={[page.get_size() for page in self.pages]})"
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.regions
+
+    def get(self, name: str) -> pygame.Surface:
+        img = self._images.get(name)
+        if img is None:
+            page, rect = self.regions[name]
+            img = self._images[name] = self.pages[page].subsurface(rect)
+        return img
+
+    def save(self, path: str):
+        """Writes the regions to `path` as JSON and every page next to it as `<stem>_<page>.png`, so there is one image
+        file per page"""
+        path = Path(path)
+        pages = []
+        for i, page in enumerate(self.pages):
+            page_path = path.with_name(f"{path.stem}_{i}.png")
+            pygame.image.save(page, str(page_path))
+            pages.append(page_path.name)
+        regions = {name: [page, *rect] for name, (page, rect) in self.regions.items()}
+        path.write_text(json.dumps({"pages": pages, "regions": regions}, indent=1))
+
+    @classmethod
+    def load(cls, path: str) -> Atlas:
+        path = Path(path)
+        index = json.loads(path.read_text())
+        pages = [_load_image_cached(str(path.with_name(name))) for name in index["pages"]]
+        return cls(pages, {name: (page, tuple(rect)) for name, (page, *rect) in index["regions"].items()})
+
+
+def pack_atlas(images: Dict[str, pygame.Surface], page_size=(2048, 2048), padding: int = 1) -> Atlas:
+    """Packs `images` into pages of at most `page_size`.
+
+    Images are placed tallest first, left to right onto shelves as high as their first image. A new shelf is started
+    when an image doesn't fit into the current one anymore, a new page when a shelf doesn't. Pages are cropped to the
+    area used."""
+    pw, ph = page_size
+    placements = []
+    used: List[List[int]] = []
+    page = -1
+    x = y = shelf = 0
+    for name, img in sorted(images.items(), key=lambda item: (-item[1].get_height(), -item[1].get_width())):
+        w, h = img.get_size()
+        if w > pw or h > ph:
+            raise ValueError(f"Image '{name}' of size {w, h} is larger than a page {page_size}")
+        if x + w > pw:
+            x, y, shelf = 0, y + shelf, 0
+        if page < 0 or y + h > ph:
+            page += 1
+            used.append([0, 0])
+            x = y = shelf = 0
+        placements.append((name, img, page, (x, y, w, h)))
+        used[page][0] = max(used[page][0], x + w)
+        used[page][1] = max(used[page][1], y + h)
+        x += w + padding
+        shelf = max(shelf, h + padding)
+    pages = [pygame.Surface(size, pygame.SRCALPHA) for size in used]
+    for page in pages:
+        page.fill((0, 0, 0, 0))
+    for _, img, page, rect in placements:
+        # Taking the maximum with the transparent page copies pixels and alpha unchanged, a normal blit would blend
+        pages[page].blit(img, rect[:2], special_flags=pygame.BLEND_RGBA_MAX)
+    return Atlas(pages, {name: (page, rect) for name, _, page, rect in placements})
+
+
+def build_atlas(names: Iterable[str], path: str, page_size=(2048, 2048), padding: int = 1) -> Atlas:
+    """Packs the images `names` into an atlas and saves it to `path`, to be loaded with `Atlas.load` at startup"""
+    images = {name: _load_image_cached(get_path(name, (".png",), "missing.png")) for name in dict.fromkeys(names)}
+    atlas = pack_atlas(images, page_size, padding)
+    atlas.save(path)
+    return atlas
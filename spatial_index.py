@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import math
+import time
+from typing import Dict, Tuple, Set, Iterator, List, Optional, Iterable
+
+import numpy as np
+
+from rect import Rect
+from vector import VectorType
+
+Bounds = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+
+
+def bounds_overlap(a: Bounds, b: Bounds) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def rect_bounds(rect: Rect) -> Bounds:
+    return rect.pos1.x, rect.pos1.y, rect.pos2.x, rect.pos2.y
+
+
+class SpatialIndex:
+    """Broadphase index of the world bounds of RectColliders, see `RectCollider.bounds`.
+
+    Anything else with a `bounds` property can be indexed as well, GameScene uses it to cull Renderers.
+
+    Colliders whose rect is None are tracked but not indexed until they get one. Bounds are only read on `insert`,
+    `update` and `refresh`, so call `refresh` once per frame (or `update` for a single collider) after things moved.
+    Only colliders whose bounds changed are re-indexed."""
+    _bounds: Dict[RectCollider, Optional[Bounds]]
+
+    def __init__(self):
+        self._bounds = {}
+
+    def __len__(self) -> int:
+        return len(self._bounds)
+
+    def __contains__(self, collider: RectCollider) -> bool:
+        return collider in self._bounds
+
+    def __iter__(self) -> Iterator[RectCollider]:
+        return iter(self._bounds)
+
+    def insert(self, collider: RectCollider):
+        if collider in self._bounds:
+            self.update(collider)
+            return
+        bounds = collider.bounds
+        self._bounds[collider] = bounds
+        if bounds is not None:
+            self._insert(collider, bounds)
+
+    def remove(self, collider: RectCollider):
+        bounds = self._bounds.pop(collider)
+        if bounds is not None:
+            self._remove(collider, bounds)
+
+    def update(self, collider: RectCollider) -> bool:
+        """Re-reads the bounds of `collider`, returns whether they changed"""
+        old, new = self._bounds[collider], collider.bounds
+        if old == new:
+            return False
+        self._bounds[collider] = new
+        if old is not None and new is not None:
+            self._move(collider, old, new)
+        elif old is not None:
+            self._remove(collider, old)
+        else:
+            self._insert(collider, new)
+        return True
+
+    def refresh(self) -> int:
+        """Updates all colliders, returns how many of them moved"""
+        return sum(self.update(collider) for collider in list(self._bounds))
+
+    def query_rect(self, rect: Rect) -> Set[RectCollider]:
+        """All colliders whose bounds overlap `rect`"""
+        bounds = rect_bounds(rect)
+        return {c for c in self._candidates(bounds) if bounds_overlap(bounds, self._bounds[c])}
+
+    def query_point(self, point: VectorType) -> Set[RectCollider]:
+        """All colliders whose bounds contain `point`"""
+        x, y = point[0], point[1]
+        return self.query_rect(Rect((x, y), (x, y)))
+
+    def all_pairs(self) -> Iterator[Tuple[RectCollider, RectCollider]]:
+        """Every pair of colliders with overlapping bounds, each pair once. Use `collide_with` as narrowphase."""
+        raise NotImplementedError
+
+    def _insert(self, collider: RectCollider, bounds: Bounds):
+        raise NotImplementedError
+
+    def _remove(self, collider: RectCollider, bounds: Bounds):
+        raise NotImplementedError
+
+    def _move(self, collider: RectCollider, old: Bounds, new: Bounds):
+        self._remove(collider, old)
+        self._insert(collider, new)
+
+    def _candidates(self, bounds: Bounds) -> Iterable[RectCollider]:
+        raise NotImplementedError
+
+
+class UniformGrid(SpatialIndex):
+    """Hashes colliders into every square cell of size `cell_size` their bounds touch.
+
+    Works best if most colliders are about as big as a cell."""
+
+    def __init__(self, cell_size: float = 1.):
+        super().__init__()
+        self.cell_size = cell_size
+        self._cells: Dict[Cell, Set[RectCollider]] = {}
+
+    def _cell_range(self, bounds: Bounds) -> Tuple[int, int, int, int]:
+        s = self.cell_size
+        return math.floor(bounds[0] / s), math.floor(bounds[1] / s), math.floor(bounds[2] / s), math.floor(bounds[3] / s)
+
+    def _insert(self, collider: RectCollider, bounds: Bounds):
+        x1, y1, x2, y2 = self._cell_range(bounds)
+        for ix in range(x1, x2 + 1):
+            for iy in range(y1, y2 + 1):
+                self._cells.setdefault((ix, iy), set()).add(collider)
+
+    def _remove(self, collider: RectCollider, bounds: Bounds):
+        x1, y1, x2, y2 = self._cell_range(bounds)
+        for ix in range(x1, x2 + 1):
+            for iy in range(y1, y2 + 1):
+                cell = self._cells[ix, iy]
+                cell.discard(collider)
+                if not cell:
+                    del self._cells[ix, iy]
+
+    def _move(self, collider: RectCollider, old: Bounds, new: Bounds):
+        if self._cell_range(old) != self._cell_range(new):
+            super()._move(collider, old, new)
+
+    def _candidates(self, bounds: Bounds) -> Iterable[RectCollider]:
+        x1, y1, x2, y2 = self._cell_range(bounds)
+        if (x2 - x1 + 1) * (y2 - y1 + 1) > len(self._cells):
+            cells = (c for (ix, iy), c in self._cells.items() if x1 <= ix <= x2 and y1 <= iy <= y2)
+        else:
+            cells = (self._cells.get((ix, iy), ()) for ix in range(x1, x2 + 1) for iy in range(y1, y2 + 1))
+        result = set()
+        for cell in cells:
+            result.update(cell)
+        return result
+
+    def all_pairs(self) -> Iterator[Tuple[RectCollider, RectCollider]]:
+        bounds = self._bounds
+        for (ix, iy), cell in self._cells.items():
+            if len(cell) < 2:
+                continue
+            members = [(c, bounds[c], self._cell_range(bounds[c])) for c in cell]
+            for i, (a, a_bounds, a_range) in enumerate(members):
+                for b, b_bounds, b_range in members[i + 1:]:
+                    # A pair sharing several cells is only reported by the first one
+                    if ix == max(a_range[0], b_range[0]) and iy == max(a_range[1], b_range[1]) and \
+                            bounds_overlap(a_bounds, b_bounds):
+                        yield a, b
+
+
+class LooseQuadtree(SpatialIndex):
+    """A hashed loose quadtree: each collider lives in exactly one node, picked by its size and center.
+
+    Nodes of level `d` have the size `root_size / 2 ** d`, and their loose bounds extend half a node size beyond that,
+    so every collider fits into the node containing its center on the deepest level whose node size is at least its
+    extent. Only non-empty nodes are stored. Colliders bigger than `root_size` are kept on level -1, which is checked
+    against everything. Handles very differently sized colliders better than `UniformGrid`."""
+
+    def __init__(self, root_size: float = 1024., max_depth: int = 16):
+        super().__init__()
+        self.root_size = root_size
+        self.max_depth = max_depth
+        self._levels: Dict[int, Dict[Cell, Set[RectCollider]]] = {depth: {} for depth in range(-1, max_depth + 1)}
+        self._nodes: Dict[RectCollider, Tuple[int, Cell]] = {}
+        self._order: Dict[RectCollider, int] = {}
+        self._counter = 0
+
+    def _node(self, bounds: Bounds) -> Tuple[int, Cell]:
+        extent = max(bounds[2] - bounds[0], bounds[3] - bounds[1])
+        if extent > self.root_size:
+            return -1, (0, 0)
+        if extent > 0:
+            depth = min(self.max_depth, max(0, math.floor(math.log2(self.root_size / extent))))
+        else:
+            depth = self.max_depth
+        size = self.root_size / 2 ** depth
+        return depth, (math.floor((bounds[0] + bounds[2]) / 2 / size), math.floor((bounds[1] + bounds[3]) / 2 / size))
+
+    def _insert(self, collider: RectCollider, bounds: Bounds):
+        depth, cell = self._nodes[collider] = self._node(bounds)
+        self._levels[depth].setdefault(cell, set()).add(collider)
+        if collider not in self._order:
+            self._order[collider] = self._counter
+            self._counter += 1
+
+    def _remove(self, collider: RectCollider, bounds: Bounds):
+        depth, cell = self._nodes.pop(collider)
+        node = self._levels[depth][cell]
+        node.discard(collider)
+        if not node:
+            del self._levels[depth][cell]
+
+    def remove(self, collider: RectCollider):
+        super().remove(collider)
+        self._order.pop(collider, None)
+
+    def _move(self, collider: RectCollider, old: Bounds, new: Bounds):
+        if self._nodes[collider] != self._node(new):
+            self._remove(collider, old)
+            self._insert(collider, new)
+
+    def _candidates(self, bounds: Bounds) -> Iterable[RectCollider]:
+        result = []
+        for depth, nodes in self._levels.items():
+            if not nodes:
+                continue
+            if depth == -1:
+                result.extend(nodes[0, 0])
+                continue
+            size = self.root_size / 2 ** depth
+            # Loose bounds reach half a node size beyond the node itself
+            x1, y1 = math.floor((bounds[0] - size / 2) / size), math.floor((bounds[1] - size / 2) / size)
+            x2, y2 = math.floor((bounds[2] + size / 2) / size), math.floor((bounds[3] + size / 2) / size)
+            if (x2 - x1 + 1) * (y2 - y1 + 1) > len(nodes):
+                for (ix, iy), node in nodes.items():
+                    if x1 <= ix <= x2 and y1 <= iy <= y2:
+                        result.extend(node)
+            else:
+                for ix in range(x1, x2 + 1):
+                    for iy in range(y1, y2 + 1):
+                        result.extend(nodes.get((ix, iy), ()))
+        return result
+
+    def all_pairs(self) -> Iterator[Tuple[RectCollider, RectCollider]]:
+        bounds, order = self._bounds, self._order
+        for a in list(self._nodes):
+            a_bounds, a_order = bounds[a], order[a]
+            for b in self._candidates(a_bounds):
+                if order[b] > a_order and bounds_overlap(a_bounds, bounds[b]):
+                    yield a, b
+
+
+class SweepReport:
+    """Statistics of the last `SweepAndPrune.pair_indices` call"""
+    __slots__ = ("colliders", "candidates", "pairs", "sort_ms", "sweep_ms")
+
+    def __init__(self):
+        self.colliders = 0
+        self.candidates = 0
+        self.pairs = 0
+        self.sort_ms = 0.
+        self.sweep_ms = 0.
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(colliders={self.colliders}, candidates={self.candidates}, " \
+               f"pairs={self.pairs}, sort_ms={self.sort_ms:.3f}, sweep_ms={self.sweep_ms:.3f})"
+
+
+class SweepAndPrune(SpatialIndex):
+    """Sorts the colliders by their left edge and sweeps along the x axis.
+
+    The order from the previous frame is kept and only re-sorted with a stable (run-detecting) sort, which is nearly
+    linear when most colliders only moved a little. The candidates of the sweep are tested for y overlap in one
+    batched numpy pass. Works best if most colliders move every frame, where grids have to re-hash a lot."""
+
+    def __init__(self):
+        super().__init__()
+        self._colliders: List[RectCollider] = []
+        self._rows: Dict[RectCollider, int] = {}
+        self._array = np.empty((0, 4))
+        self._order = np.empty(0, dtype=np.intp)
+        self._resized = False
+        self.report = SweepReport()
+
+    def _insert(self, collider: RectCollider, bounds: Bounds):
+        self._rows[collider] = len(self._colliders)
+        self._colliders.append(collider)
+        self._resized = True
+
+    def _remove(self, collider: RectCollider, bounds: Bounds):
+        row = self._rows.pop(collider)
+        last = self._colliders.pop()
+        if last is not collider:
+            self._colliders[row] = last
+            self._rows[last] = row
+        self._resized = True
+
+    def _move(self, collider: RectCollider, old: Bounds, new: Bounds):
+        if not self._resized:
+            self._array[self._rows[collider]] = new
+
+    def _sync(self) -> np.ndarray:
+        if self._resized:
+            bounds = self._bounds
+            self._array = np.array([bounds[c] for c in self._colliders], dtype=np.float64).reshape(-1, 4)
+            self._order = np.argsort(self._array[:, 0], kind="stable")
+            self._resized = False
+        else:
+            self._order = self._order[np.argsort(self._array[self._order, 0], kind="stable")]
+        return self._array
+
+    def pair_indices(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The rows (in `colliders`) of all pairs with overlapping bounds, as two index arrays"""
+        start = time.perf_counter()
+        array = self._sync()
+        order = self._order
+        sorted_bounds = array[order]
+        sort_end = time.perf_counter()
+
+        # Every collider is a candidate for all colliders after it whose left edge is left of its right edge
+        ends = np.searchsorted(sorted_bounds[:, 0], sorted_bounds[:, 2], side="right")
+        counts = np.maximum(ends - np.arange(len(order)) - 1, 0)
+        total = int(counts.sum())
+        first = np.repeat(np.arange(len(order)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = first + 1 + offsets
+        overlap = (sorted_bounds[first, 1] <= sorted_bounds[second, 3]) & \
+                  (sorted_bounds[second, 1] <= sorted_bounds[first, 3])
+        first, second = order[first[overlap]], order[second[overlap]]
+
+        report = self.report
+        report.colliders, report.candidates, report.pairs = len(order), total, len(first)
+        report.sort_ms = (sort_end - start) * 1e3
+        report.sweep_ms = (time.perf_counter() - sort_end) * 1e3
+        return first, second
+
+    @property
+    def colliders(self) -> List[RectCollider]:
+        """The indexed colliders, in the order used by `pair_indices`"""
+        return self._colliders
+
+    def pairs(self) -> List[Tuple[RectCollider, RectCollider]]:
+        first, second = self.pair_indices()
+        colliders = self._colliders
+        return [(colliders[i], colliders[j]) for i, j in zip(first.tolist(), second.tolist())]
+
+    def all_pairs(self) -> Iterator[Tuple[RectCollider, RectCollider]]:
+        return iter(self.pairs())
+
+    def _candidates(self, bounds: Bounds) -> Iterable[RectCollider]:
+        array = self._sync()
+        mask = (array[:, 0] <= bounds[2]) & (bounds[0] <= array[:, 2]) & \
+               (array[:, 1] <= bounds[3]) & (bounds[1] <= array[:, 3])
+        colliders = self._colliders
+        return [colliders[i] for i in np.flatnonzero(mask).tolist()]
+
+
+from components import RectCollider
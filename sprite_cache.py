@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import itertools
+import weakref
+from collections import OrderedDict
+from typing import Hashable, Callable, Optional, Tuple, List, Dict, Set
+
+import pygame
+
+from profiler import profiler
+
+
+def surface_bytes(surface: pygame.Surface) -> int:
+    return surface.get_pitch() * surface.get_height()
+
+
+def _release_owner(cache: weakref.ref, owner_id: int):
+    cache = cache()
+    if cache is not None:
+        cache._release(owner_id)
+
+
+class SurfaceCache:
+    """A least recently used cache of Surfaces, bounded by the total size of their pixel data.
+
+    Entries can have an owner, e.g. the Surface they were rendered from, and are dropped when it is garbage collected.
+    Their keys should refer to the owner by `id`, holding the owner itself would keep it alive."""
+    _entries: OrderedDict[Hashable, pygame.Surface]
+
+    def __init__(self, max_bytes: int = 64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        # id of owner -> keys of its entries, and the other way around
+        self._owned: Dict[int, Set[Hashable]] = {}
+        self._owners: Dict[Hashable, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(entries={len(self)}, bytes={self.bytes}, max_bytes={self.max_bytes}, " \
+               f"hit_rate={self.hit_rate:.2%}, evictions={self.evictions})"
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.
+
+    def get(self, key: Hashable) -> Optional[pygame.Surface]:
+        surface = self._entries.get(key)
+        if surface is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        return surface
+
+    def put(self, key: Hashable, surface: pygame.Surface, owner: object = None):
+        if key in self._entries:
+            self._drop(key)
+        size = surface_bytes(surface)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = surface
+        self.bytes += size
+        if owner is not None:
+            owner_id = id(owner)
+            if owner_id not in self._owned:
+                self._owned[owner_id] = set()
+                weakref.finalize(owner, _release_owner, weakref.ref(self), owner_id)
+            self._owned[owner_id].add(key)
+            self._owners[key] = owner_id
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def get_or_create(self, key: Hashable, create: Callable[[], pygame.Surface], owner: object = None
+                      ) -> pygame.Surface:
+        surface = self.get(key)
+        if surface is None:
+            surface = create()
+            self.put(key, surface, owner)
+        return surface
+
+    def _drop(self, key: Hashable):
+        self.bytes -= surface_bytes(self._entries.pop(key))
+        owner_id = self._owners.pop(key, None)
+        if owner_id is not None:
+            self._owned[owner_id].discard(key)
+
+    def drop_owned(self, owner: object):
+        """Drops the entries of `owner`, which stays registered for those put later"""
+        for key in list(self._owned.get(id(owner), ())):
+            self._drop(key)
+
+    def _release(self, owner_id: int):
+        """Drops the entries of an owner that was garbage collected"""
+        for key in self._owned.pop(owner_id, ()):
+            self.bytes -= surface_bytes(self._entries.pop(key))
+            del self._owners[key]
+
+    def clear(self):
+        self._entries.clear()
+        self._owners.clear()
+        # Owners stay registered, their finalizers are still pending
+        for keys in self._owned.values():
+            keys.clear()
+        self.bytes = 0
+
+
+# Source Surface -> [source at half size, at a quarter, ...], built as far down as requested so far. The source itself
+# is not part of its chain, that would keep it alive as the value of its own weak key
+_mip_chains: weakref.WeakKeyDictionary[pygame.Surface, List[pygame.Surface]] = weakref.WeakKeyDictionary()
+
+
+def _halve(surface: pygame.Surface) -> pygame.Surface:
+    size = max(1, surface.get_width() // 2), max(1, surface.get_height() // 2)
+    try:
+        return pygame.transform.smoothscale(surface, size)
+    except ValueError:
+        # smoothscale only takes 24 and 32 bit Surfaces
+        return pygame.transform.scale(surface, size)
+
+
+def mip_level(source: pygame.Surface, size: Tuple[int, int]) -> pygame.Surface:
+    """The smallest level of the mip-chain of `source` that is still at least `size` large.
+
+    Levels halve the size of the one before, they are built on first use and dropped with `source`."""
+    w, h = max(size[0], 1), max(size[1], 1)
+    level = source
+    if level.get_width() // 2 < w or level.get_height() // 2 < h:
+        return level
+    chain = _mip_chains.get(source)
+    if chain is None:
+        chain = _mip_chains[source] = []
+    for i in itertools.count():
+        if i == len(chain):
+            chain.append(_halve(level))
+        level = chain[i]
+        if level.get_width() // 2 < w or level.get_height() // 2 < h:
+            return level
+
+
+def transform_sprite(source: pygame.Surface, scale: Tuple[float, float], rotation: float) -> pygame.Surface:
+    """Scales `source` by `scale` (relative to its size) and rotates it `rotation` degrees counterclockwise"""
+    w, h = source.get_size()
+    return pygame.transform.rotate(pygame.transform.scale(source, (round(w * scale[0]), round(h * scale[1]))), rotation)
+
+
+class TransformedSpriteCache:
+    """Scaled and rotated versions of source Surfaces, shared by every renderer using the same source.
+
+    Scales are quantized to multiples of `scale_step`, rotations to buckets of `angle_step` degrees, so renderers with
+    nearly the same transform reuse one image."""
+
+    def __init__(self, max_bytes: int = 256 * 2 ** 20, angle_step: float = 1., scale_step: float = 0.01):
+        self.surfaces = SurfaceCache(max_bytes)
+        self.angle_step = angle_step
+        self.scale_step = scale_step
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(angle_step={self.angle_step}, scale_step={self.scale_step}, " \
+               f"surfaces={self.surfaces})"
+
+    def quantize(self, scale: Tuple[float, float], rotation: float) -> Tuple[Tuple[float, float], float]:
+        """The scale and rotation actually rendered for `scale` and `rotation`"""
+        s = self.scale_step
+        buckets = round(360 / self.angle_step)
+        return (round(scale[0] / s) * s, round(scale[1] / s) * s), round(rotation / self.angle_step) % buckets * self.angle_step
+
+    def get(self, source: pygame.Surface, scale: Tuple[float, float], rotation: float) -> pygame.Surface:
+        """`source` transformed like `transform_sprite` does, after quantizing `scale` and `rotation`"""
+        scale, rotation = self.quantize(scale, rotation)
+        return self.surfaces.get_or_create((id(source), scale, rotation), lambda: self._render(source, scale, rotation),
+                                           source)
+
+    @staticmethod
+    def _render(source: pygame.Surface, scale: Tuple[float, float], rotation: float) -> pygame.Surface:
+        with profiler.scope("sprite_cache.render_miss"):
+            return transform_sprite(source, scale, rotation)
+
+    def prewarm(self, source: pygame.Surface, scale: Tuple[float, float] = (1., 1.)) -> int:
+        """Renders every rotation bucket of `source` at `scale`, returns how many were rendered"""
+        rendered = 0
+        for bucket in range(round(360 / self.angle_step)):
+            scale_q, rotation = self.quantize(scale, bucket * self.angle_step)
+            key = id(source), scale_q, rotation
+            if key not in self.surfaces:
+                self.surfaces.put(key, transform_sprite(source, scale_q, rotation), source)
+                rendered += 1
+        return rendered
+
+
+shared_sprites = TransformedSpriteCache()
+# Images rendered by CachedRenderers, bounded in total however many renderers there are
+rendered_images = SurfaceCache(64 * 2 ** 20)
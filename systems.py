@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import ClassVar, Tuple, Type, List, Dict, Optional, Iterator, Set
+
+from components import Component, Transform
+from profiler import profiler
+
+
+class System:
+    """Game logic run by a Scheduler at a fixed timestep.
+
+    `reads` and `writes` are the Component types the system works on. `update` gets one tuple of components for every
+    GameObject that has all of them, in the order of `reads + writes`. Transforms of systems writing Transform are
+    interpolated for rendering."""
+    reads: ClassVar[Tuple[Type[Component], ...]] = ()
+    writes: ClassVar[Tuple[Type[Component], ...]] = ()
+    # Milliseconds one step of the system should take at most, steps over it are counted in its SystemStats
+    budget_ms: ClassVar[Optional[float]] = None
+
+    @property
+    def components(self) -> Tuple[Type[Component], ...]:
+        return self.reads + self.writes
+
+    def update(self, dt: float, batch: List[Tuple[Component, ...]]):
+        raise NotImplementedError
+
+
+class SystemStats:
+    """Time spent in the steps of one System, see `Scheduler`"""
+    __slots__ = ("steps", "total_ms", "last_ms", "max_ms", "over_budget")
+
+    def __init__(self):
+        self.steps = 0
+        self.total_ms = 0.
+        self.last_ms = 0.
+        self.max_ms = 0.
+        self.over_budget = 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(steps={self.steps}, mean_ms={self.mean_ms:.3f}, max_ms={self.max_ms:.3f}, " \
+               f"over_budget={self.over_budget})"
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.steps if self.steps else 0.
+
+
+class Scheduler:
+    """Runs Systems on the components of a GameScene at a fixed timestep.
+
+    `advance` runs as many steps of `step` seconds as the time passed allows, but at most `max_steps` per call. Time
+    beyond that is dropped (and added to `dropped`), so one slow frame doesn't make the following ones slower."""
+
+    def __init__(self, scene: GameScene, step: float = 1 / 60, max_steps: int = 5):
+        self.scene = scene
+        self.step = step
+        self.max_steps = max_steps
+        self.systems: List[System] = []
+        self.stats: Dict[System, SystemStats] = {}
+        self.accumulator = 0.
+        # Fraction of a step passed since the last one, used to interpolate Transforms
+        self.alpha = 0.
+        self.dropped = 0.
+        # Component tuples of all GameObjects having all of the types, by types. Rebuilt when components change
+        self._batches: Dict[Tuple[Type[Component], ...], List[Tuple[Component, ...]]] = {}
+        # Transforms written by systems and their (x, y, rotation, scale x, scale y) before the last step
+        self._previous: Dict[Transform, Tuple[float, float, float, float, float]] = {}
+        # Objects last indexed at their interpolated state, re-indexed before the next step
+        self._interpolated: Set[GameObject] = set()
+
+    def __repr__(self):
+        return f"{type(self).__name__}(systems={len(self.systems)}, step={self.step}, max_steps={self.max_steps})"
+
+    def add(self, system: System) -> System:
+        self.systems.append(system)
+        self.stats[system] = SystemStats()
+        return system
+
+    def remove(self, system: System):
+        self.systems.remove(system)
+        del self.stats[system]
+
+    def invalidate(self):
+        """Called by the scene whenever components are added or removed"""
+        self._batches.clear()
+        self._previous.clear()
+        self.scene.moved_objects.update(self._interpolated)
+        self._interpolated.clear()
+
+    def batch(self, types: Tuple[Type[Component], ...]) -> List[Tuple[Component, ...]]:
+        batch = self._batches.get(types)
+        if batch is None:
+            batch = self._batches[types] = []
+            for obj in self.scene.game_objects:
+                try:
+                    batch.append(tuple(obj.get_component(t) for t in types))
+                except ComponentNotFound:
+                    pass
+        return batch
+
+    def advance(self, dt: float) -> int:
+        """Runs the steps `dt` seconds of passed time add up to, returns how many"""
+        self.accumulator += dt
+        steps = 0
+        while self.accumulator >= self.step:
+            if steps == self.max_steps:
+                remainder = self.accumulator % self.step
+                self.dropped += self.accumulator - remainder
+                self.accumulator = remainder
+                break
+            if self._interpolated:
+                self.scene.moved_objects.update(self._interpolated)
+                self._interpolated.clear()
+            self._remember_transforms()
+            for system in self.systems:
+                self._run(system)
+            self.accumulator -= self.step
+            steps += 1
+        self.alpha = self.accumulator / self.step
+        return steps
+
+    def _run(self, system: System):
+        # Colliders moved by earlier systems have to be found where they are now
+        self.scene.update_bounds()
+        start = time.perf_counter()
+        system.update(self.step, self.batch(system.components))
+        ms = (time.perf_counter() - start) * 1e3
+        stats = self.stats[system]
+        stats.steps += 1
+        stats.total_ms += ms
+        stats.last_ms = ms
+        stats.max_ms = max(stats.max_ms, ms)
+        if system.budget_ms is not None and ms > system.budget_ms:
+            stats.over_budget += 1
+        if profiler.enabled:
+            profiler.add(f"system.{type(system).__name__}", ms)
+
+    def _written_transforms(self) -> Iterator[Transform]:
+        for system in self.systems:
+            for i, t in enumerate(system.components):
+                if issubclass(t, Transform) and t in system.writes:
+                    for components in self.batch(system.components):
+                        yield components[i]
+
+    def _remember_transforms(self):
+        self._previous.clear()
+        for transform in self._written_transforms():
+            if transform not in self._previous:
+                pos, scale = transform.pos, transform.scale
+                self._previous[transform] = pos.x, pos.y, transform.rotation, scale.x, scale.y
+
+    @contextmanager
+    def interpolated(self) -> Iterator[None]:
+        """Moves the Transforms written by systems `alpha` of the way from their state before the last step to their
+        current one, restoring the current state afterwards. Render inside of it for smooth motion.
+
+        Values are changed in place, `pos` and `scale` stay the same objects. The scene indexes the interpolated
+        bounds for rendering, and the current ones again before the next step runs."""
+        restore = []
+        alpha = self.alpha
+        moved = self.scene.moved_objects
+        for transform, (x, y, rotation, sx, sy) in self._previous.items():
+            pos, scale, current_rotation = transform.pos, transform.scale, transform.rotation
+            current = pos.x, pos.y, current_rotation, scale.x, scale.y
+            if current == (x, y, rotation, sx, sy):
+                continue
+            restore.append((transform, current))
+            # Along the shorter way around
+            turn = (current_rotation - rotation + 180) % 360 - 180
+            transform._set_state(x + (current[0] - x) * alpha, y + (current[1] - y) * alpha,
+                                 current_rotation - turn * (1 - alpha),
+                                 sx + (current[3] - sx) * alpha, sy + (current[4] - sy) * alpha)
+            moved.add(transform.game_object)
+        try:
+            yield
+        finally:
+            for transform, current in restore:
+                transform._set_state(*current)
+                self._interpolated.add(transform.game_object)
+
+
+from game_object import GameObject, ComponentNotFound
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from camera import Camera
+
+
+def mapped_box(camera, bounds):
+    x1, y1, x2, y2 = bounds
+    corners = camera.points_to_screen(np.array([[x1, y1], [x2, y1], [x1, y2], [x2, y2]], dtype=np.float64))
+    return np.concatenate((corners.min(axis=0), corners.max(axis=0)))
+
+
+@pytest.mark.parametrize("rotation", [0., 30., 90., 180., 270.])
+def test_screen_box_is_where_the_bounds_are_on_a_non_square_screen(rotation):
+    camera = Camera((5, 5), (10, 10), rotation)
+    camera.update((320, 240))
+    bounds = (4., 4.5, 6., 5.5)
+    centers, sizes, boxes = camera.bounds_to_screen(np.array([bounds]))
+    assert boxes[0] == pytest.approx(mapped_box(camera, bounds))
+    assert centers[0] == pytest.approx(camera.world_to_screen((5, 5)))
+
+
+def test_sprite_size_rotated_by_90_degrees_matches_the_box():
+    camera = Camera((5, 5), (10, 10), 90.)
+    camera.update((320, 240))
+    _, sizes, boxes = camera.bounds_to_screen(np.array([(4., 4.5, 6., 5.5)]))
+    # 2 by 1 world units, 24 pixels per unit across the screen and 32 down it once turned by 90 degrees
+    assert sizes[0] == pytest.approx((48., 32.))
+    assert boxes[0, 2:] - boxes[0, :2] == pytest.approx(sizes[0][::-1])
@@ -0,0 +1,46 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from components import Transform, RectCollider
+from game_object import GameObject
+from rect import Rect
+from vector import Vector
+
+
+def make_collider(x: float, y: float) -> RectCollider:
+    obj = GameObject()
+    obj.add_component(Transform).pos = Vector(x, y)
+    return obj.add_component(RectCollider)
+
+
+def test_rect_is_in_world_space_wherever_the_transform_is():
+    a, b = make_collider(10, 10), make_collider(-5, 3)
+    a.rect = Rect((0, 0), (1, 1))
+    b.rect = Rect((.5, .5), (2, 2))
+    assert a.bounds == (0, 0, 1, 1)
+    assert a.collide_with(b)
+    a.game_object.transform.pos = Vector(20, 20)
+    assert a.collide_with(b)
+
+
+def test_local_rect_moves_with_the_transform():
+    a, b = make_collider(0, 0), make_collider(0, 0)
+    a.local_rect = Rect((0, 0), (1, 1))
+    b.rect = Rect((5, 5), (6, 6))
+    assert not a.collide_with(b)
+    a.game_object.transform.pos = Vector(4.5, 4.5)
+    assert a.bounds == (4.5, 4.5, 5.5, 5.5)
+    assert a.collide_with(b) and b.collide_with(a)
+    a.game_object.transform.pos.x = 10
+    assert not a.collide_with(b)
+
+
+def test_setting_one_rect_clears_the_other():
+    collider = make_collider(3, 3)
+    collider.local_rect = Rect((0, 0), (1, 1))
+    collider.rect = Rect((0, 0), (1, 1))
+    assert collider.local_rect is None
+    assert collider.bounds == (0, 0, 1, 1)
+    collider.local_rect = Rect((0, 0), (1, 1))
+    assert collider.bounds == (3, 3, 4, 4)
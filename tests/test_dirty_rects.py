@@ -0,0 +1,36 @@
+import pygame
+
+from dirty_rects import DirtyRectTracker, merge_rects, MAX_REGIONS
+
+
+def test_movers_spread_over_the_screen_stay_separate_regions():
+    # An old and a new rect each for 20 sprites moved by a pixel
+    rects = [pygame.Rect(x * 50 + dx, 100, 20, 20) for x in range(20) for dx in (0, 1)]
+    regions = merge_rects(rects)
+    assert len(regions) == 20
+    assert all(region.size == (21, 20) for region in regions)
+
+
+def test_regions_beyond_the_limit_are_merged_with_their_neighbours():
+    rects = [pygame.Rect(x * 30, y * 30, 10, 10) for x in range(10) for y in range(10)]
+    regions = merge_rects(rects)
+    assert len(regions) <= MAX_REGIONS
+    assert all(region.collidelist(regions[:i]) == -1 for i, region in enumerate(regions))
+    assert all(any(region.contains(rect) for region in regions) for rect in rects)
+
+
+def test_tracker_reports_old_and_new_rects_of_changed_renderers_only():
+    tracker = DirtyRectTracker()
+    tracker.mark(["ignored before the first frame"])
+    assert tracker.changed("key") is None
+    tracker.redrawn("key", [("a", pygame.Rect(0, 0, 10, 10)), ("b", pygame.Rect(100, 0, 10, 10))])
+    tracker.mark(["a"])
+    changed = tracker.changed("key")
+    assert changed == {"a"}
+    assert tracker.update(changed, {"a": pygame.Rect(50, 0, 10, 10)}) == \
+        [pygame.Rect(0, 0, 10, 10), pygame.Rect(50, 0, 10, 10)]
+    # "b" was removed
+    tracker.mark(["b"])
+    assert tracker.update(tracker.changed("key"), {}) == [pygame.Rect(100, 0, 10, 10)]
+    assert tracker.changed("key") == set()
+    assert tracker.changed("other key") is None
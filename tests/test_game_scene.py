@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pytest.importorskip("pygame_application")
+
+import pygame
+
+from color import Color
+from components import Transform, SolidColorRenderer
+from game_object import GameObject
+from game_scene import GameScene
+from rect import Rect
+from vector import Vector
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def screen():
+    pygame.display.init()
+    yield pygame.display.set_mode((100, 100))
+    pygame.display.quit()
+
+
+def make_quad(x: float, y: float) -> GameObject:
+    obj = GameObject()
+    obj.add_component(Transform).pos = Vector(x, y)
+    obj.add_component(SolidColorRenderer).color = Color(1., 0., 0.)
+    return obj
+
+
+@pytest.mark.parametrize("pooled", [False, True])
+def test_objects_moved_into_view_in_place_are_drawn(screen, pooled):
+    held, written = make_quad(-50, 5.5), make_quad(-50, 2.5)
+    scene = GameScene("test", [held, written], Color(1., 1., 1.), pooled_transforms=pooled)
+    view = Rect((0, 0), (10, 10))
+    scene.render(screen, view)
+    assert screen.get_at((55, 55)) == (255, 255, 255)
+    pos = held.transform.pos
+    pos.x = 5.5
+    if pooled:
+        scene.transforms.pos.data[1, 0] = 2.5
+    else:
+        other = written.transform.pos
+        other += (52.5, 0)
+    scene.render(screen, view)
+    assert screen.get_at((55, 55)) == (255, 0, 0)
+    assert screen.get_at((25, 25)) == (255, 0, 0)
+
+
+@pytest.mark.parametrize("modules", ["systems, game_scene", "game_scene, systems"])
+def test_scene_and_systems_import_in_either_order(modules):
+    subprocess.run([sys.executable, "-c", f"import {modules}"], cwd=ROOT, check=True)
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import resource_loader
+
+
+def test_failed_decode_is_retried(tmp_path):
+    path = str(tmp_path / "broken.png")
+    with open(path, "wb") as f:
+        f.write(b"not a png")
+    with pytest.raises(pygame.error):
+        resource_loader._submit(path).result()
+    assert path not in resource_loader._pending
+    pygame.image.save(pygame.Surface((2, 3)), path)
+    assert resource_loader._load_image_cached(path).get_size() == (2, 3)
+
+
+def test_renderers_of_one_atlas_page_share_its_texture():
+    from components import Transform, TransformedImageRenderer
+    from game_object import GameObject
+
+    atlas = resource_loader.pack_atlas({"a": pygame.Surface((4, 4)), "b": pygame.Surface((8, 2))})
+    renderers = []
+    for name in ("a", "b"):
+        obj = GameObject()
+        obj.add_component(Transform)
+        renderer = obj.add_component(TransformedImageRenderer)
+        renderer.image = atlas.get(name)
+        renderers.append(renderer)
+    assert len(atlas.pages) == 1
+    assert renderers[0].texture is renderers[1].texture is atlas.pages[0]
@@ -0,0 +1,84 @@
+import gc
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from sprite_cache import SurfaceCache, TransformedSpriteCache, mip_level, _mip_chains
+
+
+def test_entries_are_dropped_with_their_owner():
+    cache = SurfaceCache()
+    source = pygame.Surface((8, 8))
+    cache.get_or_create((id(source), 1), lambda: pygame.Surface((4, 4)), source)
+    cache.put("unowned", pygame.Surface((4, 4)))
+    assert len(cache) == 2
+    del source
+    gc.collect()
+    assert len(cache) == 1
+    assert cache.bytes == 4 * 4 * 4
+
+
+def test_transformed_sprites_do_not_keep_their_source_alive():
+    sprites = TransformedSpriteCache()
+    source = pygame.Surface((8, 8))
+    sprites.get(source, (1., 1.), 30.)
+    sprites.prewarm(source)
+    del source
+    gc.collect()
+    assert len(sprites.surfaces) == 0
+    assert sprites.surfaces.bytes == 0
+
+
+def test_mip_levels_halve_and_die_with_their_source():
+    source = pygame.Surface((64, 32))
+    assert mip_level(source, (64, 32)) is source
+    assert mip_level(source, (16, 8)).get_size() == (16, 8)
+    assert mip_level(source, (10, 5)).get_size() == (16, 8)
+    assert mip_level(source, (1, 1)).get_size() == (2, 1)
+    assert source in _mip_chains
+    del source
+    gc.collect()
+    assert len(_mip_chains) == 0
+
+
+def test_drop_owned_keeps_other_entries_and_the_owner_registered():
+    cache = SurfaceCache()
+    a, b = pygame.Surface((8, 8)), pygame.Surface((8, 8))
+    cache.put((id(a), 1), pygame.Surface((4, 4)), a)
+    cache.put((id(b), 1), pygame.Surface((4, 4)), b)
+    cache.drop_owned(a)
+    assert list(cache._entries) == [(id(b), 1)]
+    cache.put((id(a), 2), pygame.Surface((4, 4)), a)
+    del a
+    gc.collect()
+    assert len(cache) == 1
+    assert cache.bytes == 4 * 4 * 4
+
+
+def test_cached_renderers_share_one_budget(monkeypatch):
+    from components import CachedRenderer, Transform, TransformedImageRenderer
+    from game_object import GameObject
+
+    cache = SurfaceCache(3 * 16 * 16 * 4)
+    monkeypatch.setattr(CachedRenderer, "cache", cache)
+    monkeypatch.setattr(TransformedImageRenderer, "sprite_cache", None)
+    renderers = []
+    for _ in range(5):
+        obj = GameObject()
+        obj.add_component(Transform)
+        renderer = obj.add_component(TransformedImageRenderer)
+        renderer.image = pygame.Surface((16, 16))
+        assert renderer.image.get_size() == (16, 16)
+        renderers.append(renderer)
+    assert len(cache) == 3
+    assert cache.bytes <= cache.max_bytes
+    renderers[-1].image = pygame.Surface((8, 8))
+    assert len(cache) == 2
+    del renderers[-2:], obj, renderer
+    gc.collect()
+    assert len(cache) == 1
+    del renderers
+    gc.collect()
+    assert len(cache) == 0
@@ -0,0 +1,53 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from components import Transform
+from game_object import GameObject
+from transform_pool import TransformPool
+from vector import Vector
+
+
+def make_transform(x: float, y: float) -> Transform:
+    transform = GameObject().add_component(Transform)
+    transform.pos = Vector(x, y)
+    return transform
+
+
+def test_held_pos_follows_its_transform_out_of_the_pool():
+    pool = TransformPool()
+    a, b, c = make_transform(0, 0), make_transform(1, 1), make_transform(2, 2)
+    for transform in (a, b, c):
+        pool.add(transform)
+    held = a.pos
+    pool.remove(a)
+    held.x = 100
+    assert tuple(c.pos) == (2, 2)
+    assert tuple(a.pos) == (100, 0)
+    assert tuple(pool.pos.data.tolist()) == ([2, 2], [1, 1])
+
+
+def test_held_pos_follows_its_transform_into_a_grown_buffer():
+    pool = TransformPool(capacity=1)
+    a = make_transform(0, 0)
+    pool.add(a)
+    held = a.pos
+    for i in range(1, 5):
+        pool.add(make_transform(i, i))
+    held.y = 7
+    assert tuple(a.pos) == (0, 7)
+    assert pool.pos.data[0].tolist() == [0, 7]
+
+
+def test_changed_finds_rows_written_through_the_arrays():
+    pool = TransformPool()
+    transforms = [make_transform(i, 0) for i in range(4)]
+    for transform in transforms:
+        pool.add(transform)
+    assert pool.changed() == transforms
+    assert pool.changed() == []
+    pool.rotation[2] = 45
+    pool.pos.data[0, 1] = 3
+    transforms[3].pos.x += 1
+    assert pool.changed() == [transforms[0], transforms[2], transforms[3]]
+    assert pool.changed() == []
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Union
+
+import pytest
+
+from typecheck import typecheck, stats, config
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run(code: str, strip: bool) -> str:
+    env = dict(os.environ, TYPECHECK_STRIP="1" if strip else "0")
+    return subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True, capture_output=True,
+                          text=True).stdout.strip()
+
+
+checked = pytest.mark.skipif(config["stripped"], reason="typecheck is stripped")
+
+CHECK = "from vector import Vector; " \
+        "print(hasattr(Vector.__add__, '__wrapped__'), Vector.__setattr__ is object.__setattr__)"
+
+
+def test_stripped_vector_is_unwrapped():
+    assert run(CHECK, strip=True) == "False True"
+
+
+def test_vector_is_wrapped_by_default():
+    assert run(CHECK, strip=False) == "True False"
+
+
+@checked
+def test_sampled_function_checks_every_nth_call():
+    @typecheck(sample_every=3)
+    def f(x: int) -> int:
+        return x
+
+    assert f("a") == "a" and f("b") == "b"
+    with pytest.raises(TypeError):
+        f("c")
+    assert f("d") == "d"
+    assert stats[f"{__name__}.{f.__qualname__}"] is f.typecheck_stats
+    assert (f.typecheck_stats.calls, f.typecheck_stats.skipped, f.typecheck_stats.misses) == (4, 3, 1)
+
+
+@checked
+def test_memo_skips_known_signatures_but_checks_new_ones():
+    @typecheck(memoize_types=True)
+    def f(x: Union[List[int], int]) -> int:
+        return 0
+
+    f([1])
+    # Same signature, so the contents are not checked again
+    f(["a"])
+    assert (f.typecheck_stats.hits, f.typecheck_stats.misses) == (1, 1)
+    f(1)
+    with pytest.raises(TypeError):
+        f("a")
+    assert f.typecheck_stats.signatures == 2
+    assert f.typecheck_stats.hit_rate == pytest.approx(1 / 4)
+
+
+@checked
+def test_memo_stops_growing_at_max_signatures():
+    @typecheck(memoize_types=True, max_signatures=2)
+    def f(x: Union[int, float, str]) -> int:
+        return 0
+
+    for x in (1, 1, 1., "a", b"not checked any more"):
+        f(x)
+    assert f.typecheck_stats.signatures == 2
+    assert (f.typecheck_stats.hits, f.typecheck_stats.misses, f.typecheck_stats.skipped) == (1, 2, 2)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from vector import Vector, VectorArray
+
+
+class PooledVector(Vector):
+    """`pos` or `scale` of a pooled Transform.
+
+    The row is looked up through the Transform on every access, so a held PooledVector stays attached to its
+    Transform when the pool moves it to another row or buffer, and when it is removed from the pool."""
+    __slots__ = ("_transform", "_field")
+
+    def __init__(self, transform: Transform, field: str):
+        object.__setattr__(self, "_transform", transform)
+        object.__setattr__(self, "_field", field)
+
+    @property
+    def x(self) -> float:
+        transform = self._transform
+        if transform.pool is None:
+            return getattr(transform, self._field).x
+        return float(getattr(transform.pool, self._field)[transform.index, 0])
+
+    @x.setter
+    def x(self, value: float):
+        transform = self._transform
+        if transform.pool is None:
+            getattr(transform, self._field).x = value
+        else:
+            getattr(transform.pool, self._field)[transform.index, 0] = value
+
+    @property
+    def y(self) -> float:
+        transform = self._transform
+        if transform.pool is None:
+            return getattr(transform, self._field).y
+        return float(getattr(transform.pool, self._field)[transform.index, 1])
+
+    @y.setter
+    def y(self, value: float):
+        transform = self._transform
+        if transform.pool is None:
+            getattr(transform, self._field).y = value
+        else:
+            getattr(transform.pool, self._field)[transform.index, 1] = value
+
+
+class TransformPool:
+    """Structure-of-arrays storage for the Transforms of a GameScene.
+
+    Positions, scales and rotations of all pooled Transforms live in contiguous arrays, the Transforms themselves only
+    hold their index. Bulk systems can work on `pos`, `scale` and `rotation` directly, row `i` belonging to
+    `handles[i]`. Removing a Transform moves the last one into its row, so the arrays are always dense.
+
+    Writes to the arrays don't go through the Transforms, `changed` finds the rows they touched by comparing with a
+    copy of the arrays."""
+    handles: List[Transform]
+
+    def __init__(self, capacity: int = 64):
+        self._pos = np.zeros((capacity, 2))
+        self._scale = np.ones((capacity, 2))
+        self._rotation = np.zeros(capacity)
+        self.handles = []
+        # pos, scale and rotation of all rows as of the last call of `changed`
+        self._seen: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.handles)
+
+    def __contains__(self, transform: Transform) -> bool:
+        return transform.pool is self
+
+    @property
+    def capacity(self) -> int:
+        return len(self._rotation)
+
+    @property
+    def pos(self) -> VectorArray:
+        return VectorArray(self._pos[:len(self.handles)])
+
+    @pos.setter
+    def pos(self, value: VectorArray):
+        self._pos[:len(self.handles)] = value.data if isinstance(value, VectorArray) else value
+
+    @property
+    def scale(self) -> VectorArray:
+        return VectorArray(self._scale[:len(self.handles)])
+
+    @scale.setter
+    def scale(self, value: VectorArray):
+        self._scale[:len(self.handles)] = value.data if isinstance(value, VectorArray) else value
+
+    @property
+    def rotation(self) -> np.ndarray:
+        return self._rotation[:len(self.handles)]
+
+    @rotation.setter
+    def rotation(self, value: np.ndarray):
+        self._rotation[:len(self.handles)] = value
+
+    def changed(self) -> List[Transform]:
+        """The Transforms whose rows changed since the last call, including those written through the arrays.
+        Rows added since count as changed"""
+        n = len(self.handles)
+        pos, scale, rotation = self._pos[:n], self._scale[:n], self._rotation[:n]
+        seen_pos, seen_scale, seen_rotation = self._seen or (pos[:0], scale[:0], rotation[:0])
+        m = min(n, len(seen_rotation))
+        rows = np.flatnonzero((pos[:m] != seen_pos[:m]).any(axis=1) | (scale[:m] != seen_scale[:m]).any(axis=1) |
+                              (rotation[:m] != seen_rotation[:m])).tolist()
+        rows.extend(range(m, n))
+        if rows or n != len(seen_rotation):
+            self._seen = pos.copy(), scale.copy(), rotation.copy()
+        return [self.handles[i] for i in rows]
+
+    def _grow(self, capacity: int):
+        n = len(self.handles)
+        pos, scale, rotation = np.zeros((capacity, 2)), np.ones((capacity, 2)), np.zeros(capacity)
+        pos[:n], scale[:n], rotation[:n] = self._pos[:n], self._scale[:n], self._rotation[:n]
+        self._pos, self._scale, self._rotation = pos, scale, rotation
+
+    def add(self, transform: Transform):
+        """Moves the state of `transform` into the pool"""
+        if transform.pool is not None:
+            if transform.pool is self:
+                return
+            transform.pool.remove(transform)
+        index = len(self.handles)
+        if index == self.capacity:
+            self._grow(max(2 * self.capacity, 1))
+        self._pos[index] = tuple(transform.pos)
+        self._scale[index] = tuple(transform.scale)
+        self._rotation[index] = transform.rotation
+        self.handles.append(transform)
+        transform.pool, transform.index = self, index
+        transform._pos, transform._scale = PooledVector(transform, "_pos"), PooledVector(transform, "_scale")
+
+    def remove(self, transform: Transform):
+        """Gives `transform` its own state again and fills its row with the last pooled Transform"""
+        if transform.pool is not self:
+            raise ValueError(f"{transform} is not part of this {self.__class__.__name__}")
+        index, last = transform.index, len(self.handles) - 1
+        pos, scale, rotation = self._pos[index].tolist(), self._scale[index].tolist(), float(self._rotation[index])
+        if index != last:
+            moved = self.handles[last]
+            self._pos[index], self._scale[index], self._rotation[index] = \
+                self._pos[last], self._scale[last], self._rotation[last]
+            self.handles[index] = moved
+            moved.index = index
+        self.handles.pop()
+        transform.pool, transform.index = None, -1
+        transform._pos, transform._scale = TransformVector(transform, *pos), TransformVector(transform, *scale)
+        transform._rotation = rotation
+
+    def shrink(self):
+        """Releases unused capacity"""
+        self._grow(max(len(self.handles), 1))
+
+
+from components import Transform, TransformVector
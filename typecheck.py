@@ -1,22 +1,42 @@
 from __future__ import annotations
 
+import collections.abc
 import inspect
+import os
 from functools import wraps
-from typing import Dict, Tuple, Any, get_type_hints, Callable, _GenericAlias, Union, Iterable, Sequence, _SpecialForm
+from typing import Dict, Tuple, Any, get_type_hints, Callable, _GenericAlias, Union, Iterable, Sequence, _SpecialForm, \
+    Optional, get_origin, get_args
+
+Checker = Callable[[Any], bool]
+Validator = Callable[[Tuple[Any, ...], Dict[str, Any]], bool]
+
+STRIP_ENV_VAR = "TYPECHECK_STRIP"
 
 config = dict(
-    enabled=__debug__
+    # Stripped means the decorators return the original class or function, so there is no wrapper overhead at all.
+    # Only has an effect on modules decorated afterwards: set it (or the environment variable, or run with -O)
+    # before importing them.
+    stripped=not __debug__ or os.environ.get(STRIP_ENV_VAR, "") not in ("", "0"),
+)
+config["enabled"] = not config["stripped"]
+# Default check policy of `typecheck`, see there
+config.update(
+    sample_every=1,
+    max_signatures=None,
+    memoize_types=False,
 )
 
 
 def typecheck_value(type_hint: Any, value: Any) -> bool:
+    if type_hint is Any:
+        return True
     try:
         return isinstance(value, type_hint)
     except TypeError:
         if type_hint.__class__ is _SpecialForm:
             if type_hint._name == 'Any':
                 return True
-        elif type_hint.__class__ is _GenericAlias:
+        elif isinstance(type_hint, _GenericAlias):
             if type_hint._name == 'Tuple':
                 if not isinstance(value, tuple):
                     return False
@@ -59,40 +79,236 @@ def typecheck_function(func: Callable, args: Tuple[Any, ...], kwargs: Dict[str,
     return True
 
 
-def get_typechecked_function(func: Callable, type_hints: Dict[str, Any] = None, localns: Dict[str, Any] = None):
+_checker_cache: Dict[Any, Optional[Checker]] = {}
+
+
+def compile_checker(type_hint: Any) -> Optional[Checker]:
+    """Returns a predicate equivalent to `typecheck_value(type_hint, value)`, or None if every value is allowed.
+
+    Checkers are memoized per type hint, so every function using the same hint shares one closure."""
+    try:
+        return _checker_cache[type_hint]
+    except KeyError:
+        checker = _checker_cache[type_hint] = _compile_checker(type_hint)
+        return checker
+    except TypeError:  # unhashable type hint
+        return _compile_checker(type_hint)
+
+
+def _compile_checker(type_hint: Any) -> Optional[Checker]:
+    if type_hint is Any or type_hint is object:
+        return None
+    if type_hint is None or type_hint is type(None):
+        return lambda value: value is None
+    origin = get_origin(type_hint)
+    if origin is None:
+        if isinstance(type_hint, type):
+            return lambda value: isinstance(value, type_hint)
+        return _unsupported_checker(type_hint)
+    args = get_args(type_hint)
+    if origin is Union:
+        checkers = tuple(compile_checker(th) for th in args)
+        if None in checkers:
+            return None
+        if all(isinstance(th, type) for th in args):
+            return lambda value: isinstance(value, args)
+        return lambda value: any(check(value) for check in checkers)
+    if origin is tuple:
+        if len(args) == 2 and args[-1] is Ellipsis:
+            return _compile_items_checker(tuple, args[0])
+        checkers = tuple(compile_checker(th) for th in args)
+        return lambda value: isinstance(value, tuple) and len(value) == len(checkers) and \
+                             all(check is None or check(v) for check, v in zip(checkers, value))
+    if origin is dict:
+        check_key, check_value = (compile_checker(th) for th in args)
+        return lambda value: isinstance(value, dict) and all((check_key is None or check_key(k)) and
+                                                             (check_value is None or check_value(v))
+                                                             for k, v in value.items())
+    if origin is collections.abc.Sequence or origin is list:
+        return _compile_items_checker(origin, args[0] if args else Any)
+    if isinstance(origin, type):
+        # Iterables and other generics are only checked against their origin, their items aren't consumed
+        return lambda value: isinstance(value, origin)
+    return _unsupported_checker(type_hint)
+
+
+def _unsupported_checker(type_hint: Any) -> Checker:
+    # Defer the error to the first check, like `typecheck_value` does
+    def check(value: Any) -> bool:
+        raise TypeError(f"Can't handle type hint {type_hint}")
+
+    return check
+
+
+def _compile_items_checker(container: type, item_hint: Any) -> Checker:
+    check_item = compile_checker(item_hint)
+    if check_item is None:
+        return lambda value: isinstance(value, container)
+    if isinstance(item_hint, type):
+        return lambda value: isinstance(value, container) and all(isinstance(v, item_hint) for v in value)
+    return lambda value: isinstance(value, container) and all(check_item(v) for v in value)
+
+
+def compile_validator(func: Callable, type_hints: Dict[str, Any]) -> Validator:
+    """Turns the signature of `func` into a flat check chain over `(args, kwargs)`.
+
+    This is the precompiled equivalent of `typecheck_function`: the signature is only inspected once and
+    parameters typed as `Any` (or not typed at all) are never looked at."""
+    positional = []
+    named: Dict[str, Optional[Checker]] = {}
+    var_positional = var_keyword = None
+    has_var_positional = has_var_keyword = False
+    for param in inspect.signature(func).parameters.values():
+        checker = compile_checker(type_hints.get(param.name, Any))
+        if param.kind is param.VAR_POSITIONAL:
+            var_positional, has_var_positional = checker, True
+        elif param.kind is param.VAR_KEYWORD:
+            var_keyword, has_var_keyword = checker, True
+        else:
+            if param.kind is not param.KEYWORD_ONLY:
+                positional.append(checker)
+            if param.kind is not param.POSITIONAL_ONLY:
+                named[param.name] = checker
+    positional = tuple(positional)
+    positional_count = len(positional)
+
+    def validate(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> bool:
+        for check, value in zip(positional, args):
+            if check is not None and not check(value):
+                return False
+        if len(args) > positional_count:
+            if not has_var_positional:
+                return False
+            if var_positional is not None and not all(var_positional(v) for v in args[positional_count:]):
+                return False
+        if kwargs:
+            for name, value in kwargs.items():
+                if name in named:
+                    check = named[name]
+                elif has_var_keyword:
+                    check = var_keyword
+                else:
+                    return False
+                if check is not None and not check(value):
+                    return False
+        return True
+
+    return validate
+
+
+class CheckStats:
+    """Counters of a sampled or memoized typechecked function, see `typecheck`"""
+    __slots__ = ("calls", "hits", "misses", "skipped", "signatures")
+
+    def __init__(self):
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.signatures = 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(calls={self.calls}, hits={self.hits}, misses={self.misses}, " \
+               f"skipped={self.skipped}, signatures={self.signatures})"
+
+    @property
+    def hit_rate(self) -> float:
+        checked = self.hits + self.misses
+        return self.hits / checked if checked else 0.
+
+
+stats: Dict[str, CheckStats] = {}
+
+
+def _type_signature(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Any, ...]:
+    if kwargs:
+        return tuple(map(type, args)) + tuple((k, type(v)) for k, v in kwargs.items())
+    return tuple(map(type, args))
+
+
+def get_typechecked_function(func: Callable, type_hints: Dict[str, Any] = None, localns: Dict[str, Any] = None, *,
+                             sample_every: int = 1, max_signatures: int = None, memoize_types: bool = False):
+    if config["stripped"]:
+        return func
     if type_hints is None:
         type_hints = get_type_hints(func, localns=localns)
     result_type_hint = type_hints.get("return", Any)
+    validate = compile_validator(func, type_hints)
+    check_result = compile_checker(result_type_hint)
+
+    def check_args(args, kwargs):
+        if not validate(args, kwargs):
+            raise TypeError(f"Unallowed args or kwargs for function '{func.__qualname__}' (args:{args}, kwargs:{kwargs}) ({type_hints})")
+
+    def check_return(result):
+        if check_result is not None and not check_result(result):
+            raise TypeError(f"Unexpected return value '{result}'. Expected '{result_type_hint}'")
+
+    if sample_every == 1 and max_signatures is None and not memoize_types:
+        @wraps(func)
+        def _(*args, **kwargs):
+            if not config["enabled"]:
+                return func(*args, **kwargs)
+            check_args(args, kwargs)
+            result = func(*args, **kwargs)
+            check_return(result)
+            return result
+
+        return _
+
+    func_stats = stats[f"{func.__module__}.{func.__qualname__}"] = CheckStats()
+    passed_signatures = set()
+    passed_results = set()
 
     @wraps(func)
     def _(*args, **kwargs):
-        if config["enabled"]:
-            if not typecheck_function(func, args, kwargs, type_hints, localns):
-                raise TypeError(f"Unallowed args or kwargs for function '{func.__qualname__}' (args:{args}, kwargs:{kwargs}) ({type_hints})")
-
+        if not config["enabled"]:
+            return func(*args, **kwargs)
+        func_stats.calls += 1
+        if (max_signatures is not None and func_stats.signatures >= max_signatures) or func_stats.calls % sample_every:
+            func_stats.skipped += 1
+            return func(*args, **kwargs)
+        signature = _type_signature(args, kwargs)
+        if memoize_types and signature in passed_signatures:
+            func_stats.hits += 1
+            result = func(*args, **kwargs)
+            if type(result) not in passed_results:
+                check_return(result)
+                passed_results.add(type(result))
+            return result
+        func_stats.misses += 1
+        check_args(args, kwargs)
         result = func(*args, **kwargs)
-        if config["enabled"]:
-            if not typecheck_value(result_type_hint, result):
-                raise TypeError(f"Unexpected return value '{result}'. Expected '{result_type_hint}'")
+        check_return(result)
+        if signature not in passed_signatures:
+            passed_signatures.add(signature)
+            func_stats.signatures += 1
+        passed_results.add(type(result))
         return result
 
+    _.typecheck_stats = func_stats
     return _
 
-def get_typechecked_class(cls: type, check_setattr=False):
+
+def get_typechecked_class(cls: type, check_setattr=False, **policy):
+    if config["stripped"]:
+        return cls
     localns = {cls.__name__: cls}
     for n, v in cls.__dict__.items():
         if callable(v):
-            setattr(cls, n, get_typechecked_function(v, localns=localns))
+            setattr(cls, n, get_typechecked_function(v, localns=localns, **policy))
     if "__setattr__" not in cls.__dict__ and check_setattr:
         old_setattr = cls.__setattr__
         type_hints = get_type_hints(cls, localns=localns)
+        checkers = {name: compile_checker(th) for name, th in type_hints.items()}
 
         @wraps(old_setattr)
         def __setattr__(obj, name, value):
             if config["enabled"]:
-                if name not in type_hints:
+                if name not in checkers:
                     raise TypeError(f"Can't create attribute '{name}' for class '{cls.__name__}'")
-                if not typecheck_value(type_hints[name], value):
+                check = checkers[name]
+                if check is not None and not check(value):
                     raise TypeError(f"Can't set attribute '{name}' of class '{cls.__name__}' to value '{value}'")
             return old_setattr(obj, name, value)
 
@@ -100,12 +316,27 @@ def get_typechecked_class(cls: type, check_setattr=False):
     return cls
 
 
-def typecheck(obj: Union[type, Callable] = None, *, typecheck_setattr=False):
+def typecheck(obj: Union[type, Callable] = None, *, typecheck_setattr=False,
+              sample_every: int = None, max_signatures: int = None, memoize_types: bool = None):
+    """Typechecks the arguments and return values of a function, or of every method of a class.
+
+    The check policy defaults to `config`:
+    - `sample_every=N` only checks every N-th call.
+    - `max_signatures=K` stops checking a function after K distinct argument type signatures passed.
+    - `memoize_types` skips the check for argument type signatures that already passed. Container contents are only
+      checked the first time, e.g. a `(Vector, tuple)` call to `Vector.__sub__` becomes a single set lookup.
+    Sampled or memoized functions count their hits and misses in `stats` (and `func.typecheck_stats`)."""
+    policy = dict(
+        sample_every=config["sample_every"] if sample_every is None else sample_every,
+        max_signatures=config["max_signatures"] if max_signatures is None else max_signatures,
+        memoize_types=config["memoize_types"] if memoize_types is None else memoize_types,
+    )
+
     def _(obj: Union[type, Callable]):
         if isinstance(obj, type):
-            return get_typechecked_class(obj, typecheck_setattr)
+            return get_typechecked_class(obj, typecheck_setattr, **policy)
         else:
-            return get_typechecked_function(obj)
+            return get_typechecked_function(obj, **policy)
 
     if obj is not None:
         return _(obj)
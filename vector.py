@@ -3,7 +3,9 @@ from __future__ import annotations
 import math
 import random
 from numbers import Real
-from typing import Union, Sequence, cast, Tuple
+from typing import Union, Sequence, cast, Tuple, Iterable, Iterator
+
+import numpy as np
 
 from typecheck import typecheck
 
@@ -189,3 +191,199 @@ class Vector(VectorType):
     def rounded(self) -> Tuple[Real, Real]:
         """A tuple with the x and y values of the Vector rounded to the nearest integer"""
         return round(self.x), round(self.y)
+
+
+class VectorView(Vector):
+    """A Vector whose x and y live in row `index` of a (N, 2) buffer, see `VectorArray`"""
+    __slots__ = ("_buffer", "_index")
+
+    def __init__(self, buffer: np.ndarray, index: int):
+        object.__setattr__(self, "_buffer", buffer)
+        object.__setattr__(self, "_index", index)
+
+    @property
+    def x(self) -> Real:
+        return float(self._buffer[self._index, 0])
+
+    @x.setter
+    def x(self, value: Real):
+        self._buffer[self._index, 0] = value
+
+    @property
+    def y(self) -> Real:
+        return float(self._buffer[self._index, 1])
+
+    @y.setter
+    def y(self, value: Real):
+        self._buffer[self._index, 1] = value
+
+
+ArrayLike = Union["VectorArray", np.ndarray, VectorType, Real]
+
+
+class VectorArray:
+    """N Vectors stored in one (N, 2) float64 buffer.
+
+    The arithmetic matches the methods of `Vector`, applied to every row at once. The other operand can be another
+    VectorArray or array of the same length, or a single Vector which is applied to every row.
+    Indexing returns a `VectorView` into the buffer, slicing a VectorArray sharing the buffer."""
+    __slots__ = ("data",)
+    __array_ufunc__ = None  # Make numpy defer to the reflected operators below
+
+    data: np.ndarray
+
+    def __init__(self, data: Union[np.ndarray, Iterable[VectorType]] = ()):
+        data = np.asarray(data if isinstance(data, np.ndarray) else list(data), dtype=np.float64)
+        if data.size == 0:
+            data = data.reshape(0, 2)
+        if data.ndim != 2 or data.shape[1] != 2:
+            raise ValueError(f"Can't create {type(self).__name__} from array with shape {data.shape}")
+        self.data = data
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.data.tolist()})"
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, i: Union[int, slice, np.ndarray]) -> Union[VectorView, VectorArray]:
+        if isinstance(i, (int, np.integer)):
+            if not -len(self.data) <= i < len(self.data):
+                raise IndexError(f"{type(self).__name__} index {i} out of range")
+            return VectorView(self.data, int(i) % len(self.data))
+        return VectorArray(self.data[i])
+
+    def __setitem__(self, i: Union[int, slice, np.ndarray], value: ArrayLike):
+        self.data[i] = self._operand(value)
+
+    def __iter__(self) -> Iterator[VectorView]:
+        return (VectorView(self.data, i) for i in range(len(self.data)))
+
+    @classmethod
+    def zeros(cls, n: int) -> VectorArray:
+        return cls(np.zeros((n, 2)))
+
+    @classmethod
+    def from_polar(cls, rotation: Union[np.ndarray, Real], magnitude: Union[np.ndarray, Real]) -> VectorArray:
+        """Creates a new VectorArray with the given rotations and magnitudes, like `Vector.from_polar`"""
+        rotation, magnitude = np.broadcast_arrays(np.asarray(rotation, dtype=np.float64),
+                                                  np.asarray(magnitude, dtype=np.float64))
+        return cls(np.stack((np.cos(rotation) * magnitude, np.sin(rotation) * magnitude), axis=-1).reshape(-1, 2))
+
+    @staticmethod
+    def _operand(other: ArrayLike) -> np.ndarray:
+        if isinstance(other, VectorArray):
+            return other.data
+        return np.asarray(other, dtype=np.float64)
+
+    def _vector_operand(self, other: ArrayLike, op: str) -> np.ndarray:
+        other = self._operand(other)
+        if other.shape[-1:] != (2,):
+            raise ValueError(f"Can't {op} array with shape {other.shape} and {type(self).__name__}")
+        return other
+
+    def _scalar_operand(self, other: ArrayLike) -> np.ndarray:
+        other = self._operand(other)
+        if other.ndim == 1:
+            return other[:, None]
+        return other
+
+    def _div_operand(self, other: ArrayLike) -> np.ndarray:
+        if isinstance(other, (VectorArray, Sequence)):
+            return self._vector_operand(other, "divide")
+        return self._scalar_operand(other)
+
+    def __add__(self, other: ArrayLike) -> VectorArray:
+        return VectorArray(self.data + self._vector_operand(other, "add"))
+
+    def __radd__(self, other: ArrayLike) -> VectorArray:
+        return VectorArray(self._vector_operand(other, "add") + self.data)
+
+    def __iadd__(self, other: ArrayLike) -> VectorArray:
+        self.data += self._vector_operand(other, "add")
+        return self
+
+    def __sub__(self, other: ArrayLike) -> VectorArray:
+        return VectorArray(self.data - self._vector_operand(other, "sub"))
+
+    def __rsub__(self, other: ArrayLike) -> VectorArray:
+        return VectorArray(self._vector_operand(other, "sub") - self.data)
+
+    def __isub__(self, other: ArrayLike) -> VectorArray:
+        self.data -= self._vector_operand(other, "sub")
+        return self
+
+    def __mul__(self, other: Union[np.ndarray, Real]) -> VectorArray:
+        """Multiplies every row with a scalar, or with the matching entry of a (N,) array"""
+        return VectorArray(self.data * self._scalar_operand(other))
+
+    __rmul__ = __mul__
+
+    def __imul__(self, other: Union[np.ndarray, Real]) -> VectorArray:
+        self.data *= self._scalar_operand(other)
+        return self
+
+    def __matmul__(self, other: ArrayLike) -> VectorArray:
+        return VectorArray(self.data * self._vector_operand(other, "mul"))
+
+    __rmatmul__ = __matmul__
+
+    def __imatmul__(self, other: ArrayLike) -> VectorArray:
+        self.data *= self._vector_operand(other, "mul")
+        return self
+
+    def __truediv__(self, other: ArrayLike) -> VectorArray:
+        return VectorArray(self.data / self._div_operand(other))
+
+    def __rtruediv__(self, other: ArrayLike) -> VectorArray:
+        return VectorArray(self._div_operand(other) / self.data)
+
+    def __itruediv__(self, other: ArrayLike) -> VectorArray:
+        self.data /= self._div_operand(other)
+        return self
+
+    def change_rotation(self, rotation: Union[np.ndarray, Real]) -> VectorArray:
+        """Returns a new VectorArray with added rotation"""
+        v = VectorArray(self.data.copy())
+        v.rotation = v.rotation + rotation
+        return v
+
+    def change_magnitude(self, magnitude: Union[np.ndarray, Real]) -> VectorArray:
+        """Returns a new VectorArray with added magnitude"""
+        v = VectorArray(self.data.copy())
+        v.magnitude = v.magnitude + magnitude
+        return v
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.data[:, 1]
+
+    @property
+    def magnitude(self) -> np.ndarray:
+        """The magnitudes of the Vectors"""
+        return np.hypot(self.data[:, 0], self.data[:, 1])
+
+    @magnitude.setter
+    def magnitude(self, length: Union[np.ndarray, Real]):
+        self.data *= (np.asarray(length, dtype=np.float64) / self.magnitude)[..., None]
+
+    @property
+    def rotation(self) -> np.ndarray:
+        """The rotations in radians of the Vectors, like `Vector.rotation`"""
+        return np.arctan2(self.data[:, 0], self.data[:, 1])
+
+    @rotation.setter
+    def rotation(self, angle: Union[np.ndarray, Real]):
+        m = self.magnitude
+        angle = np.asarray(angle, dtype=np.float64)
+        self.data[:, 0] = np.sin(angle) * m
+        self.data[:, 1] = np.cos(angle) * m
+
+    @property
+    def rounded(self) -> np.ndarray:
+        """A (N, 2) int array with the x and y values rounded to the nearest integer"""
+        return np.rint(self.data).astype(np.int64)